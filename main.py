@@ -1,6 +1,7 @@
 import asyncio
 import logging
 from src.bot.app import start_bot
+from src.config import settings
 
 logging.basicConfig(
     level=logging.INFO,
@@ -9,7 +10,11 @@ logging.basicConfig(
 
 if __name__ == "__main__":
     try:
-        asyncio.run(start_bot())
+        if settings.WORKERS > 1:
+            from src.bot.supervisor import run_supervisor
+            asyncio.run(run_supervisor())
+        else:
+            asyncio.run(start_bot())
     except KeyboardInterrupt:
         print("Bot stopped by user")
     except Exception as e:
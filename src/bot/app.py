@@ -1,29 +1,115 @@
+import asyncio
+import re
+from typing import List
+from aiohttp import web
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from src.config import settings
 from src.bot.routers import setup_routers
+from src.bot.middlewares import setup_middlewares
+from src.bot.images import image_pipeline
+from src.bot.outbound import create_bot, outbound
+from src.bot.storage import create_storage
+from src.database import db
 from src.database.seed_data import seed_database
 
 
-async def start_bot():
-    bot = Bot(token=settings.BOT_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+WEBHOOK_SECRET_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,256}")
+
+
+def webhook_url() -> str:
+    if not settings.WEBHOOK_URL or not settings.WEBHOOK_SECRET:
+        raise RuntimeError("BOT_MODE=webhook requires WEBHOOK_URL and WEBHOOK_SECRET")
+    if not WEBHOOK_SECRET_PATTERN.fullmatch(settings.WEBHOOK_SECRET):
+        raise RuntimeError("WEBHOOK_SECRET must be 1-256 characters of A-Z, a-z, 0-9, _ or -")
+    return f"{settings.WEBHOOK_URL.rstrip('/')}{settings.WEBHOOK_PATH}"
+
+
+async def register_webhook(bot: Bot, allowed_updates: List[str]) -> None:
+    await bot.set_webhook(
+        webhook_url(),
+        secret_token=settings.WEBHOOK_SECRET,
+        allowed_updates=allowed_updates,
+        drop_pending_updates=False
+    )
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    async def on_startup(bot: Bot) -> None:
+        await register_webhook(bot, dp.resolve_used_update_types())
+
+    dp.startup.register(on_startup)
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.WEBHOOK_SECRET
+    ).register(app, path=settings.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+        await site.start()
+        print(f"Webhook listening on {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 
+
+def create_dispatcher() -> Dispatcher:
+    dp = Dispatcher(storage=create_storage())
+    setup_middlewares(dp)
     setup_routers(dp)
+    dp["outbound"] = outbound
+    return dp
+
 
+async def seed() -> None:
     try:
-        if seed_database():
+        if await seed_database():
             print("Demo data seeded successfully!")
         else:
             print("Database already has data, skipping seed.")
     except Exception as e:
         print(f"Seed skipped: {e}")
 
-    await bot.delete_webhook(drop_pending_updates=True)
+
+async def start_services() -> None:
+    await db.load_settings()
+    db.ledger.start()
+    outbound.start()
+    if settings.LOCAL_SEARCH_INDEX:
+        print(f"Search index built with {await db.build_search_index()} products")
+
+
+async def stop_services(bot: Bot, dp: Dispatcher) -> None:
+    await outbound.stop()
+    await bot.session.close()
+    await dp.storage.close()
+    await image_pipeline.close()
+    await db.close()
+
+
+async def start_bot():
+    if settings.BOT_MODE == "webhook":
+        webhook_url()
+
+    bot = create_bot()
+    dp = create_dispatcher()
+
+    await seed()
+    await start_services()
 
     try:
-        print("Bot is running...")
-        await dp.start_polling(bot)
+        if settings.BOT_MODE == "webhook":
+            print("Bot is running (webhook)...")
+            await run_webhook(bot, dp)
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            print("Bot is running...")
+            await dp.start_polling(bot)
     finally:
-        await bot.session.close()
+        await stop_services(bot, dp)
@@ -1,8 +1,11 @@
+from typing import Optional
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, ForceReply
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.filters import Command
+from src.bot.middlewares.throttling import ThrottlingMiddleware
+from src.bot.outbound import OutboundScheduler
 from src.database import db
 from src.config import settings
 
@@ -87,12 +90,17 @@ async def admin_panel_callback(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "admin_dashboard")
-async def admin_dashboard(callback: CallbackQuery):
+async def admin_dashboard(
+    callback: CallbackQuery,
+    throttling: Optional[ThrottlingMiddleware] = None,
+    outbound: Optional[OutboundScheduler] = None
+):
     if not is_admin(callback.from_user.id):
         await callback.answer("Authorized Personnel Only", show_alert=True)
         return
 
-    stats = db.get_stats()
+    stats = await db.get_stats()
+    transport = db.get_transport_stats()
 
     text = (
         "Dashboard\n\n"
@@ -100,11 +108,25 @@ async def admin_dashboard(callback: CallbackQuery):
         f"Total Orders: {stats['total_orders']}\n"
         f"Total Revenue: ${stats['total_revenue']:.2f}\n"
         f"Active Products: {stats['total_products']}\n"
-        f"Stock Available: {stats['total_stock']}\n"
+        f"Stock Available: {stats['total_stock']}\n\n"
+        f"DB Requests: {transport['in_flight']}/{transport['max_inflight']} in flight, "
+        f"{transport['queued']} queued (peak {transport['peak_in_flight']})\n"
     )
+    if throttling is not None:
+        throttle = throttling.stats()
+        text += f"Throttled: {throttle['throttled']} of {throttle['allowed'] + throttle['throttled']} updates\n"
+    if outbound is not None:
+        sends = outbound.stats()
+        text += (
+            f"Outbound: {sends['sent']} sent, {sends['queued']} queued (peak {sends['peak_queued']}), "
+            f"{sends['retried']} flood waits, {sends['failed']} failed\n"
+        )
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="Refresh", callback_data="admin_dashboard")],
+        [
+            InlineKeyboardButton(text="Refresh", callback_data="admin_dashboard"),
+            InlineKeyboardButton(text="Recount", callback_data="admin_recount_stats")
+        ],
         [InlineKeyboardButton(text="Back", callback_data="admin_panel")]
     ])
 
@@ -112,13 +134,30 @@ async def admin_dashboard(callback: CallbackQuery):
     await callback.answer()
 
 
+@router.callback_query(F.data == "admin_recount_stats")
+async def admin_recount_stats(
+    callback: CallbackQuery,
+    throttling: Optional[ThrottlingMiddleware] = None,
+    outbound: Optional[OutboundScheduler] = None
+):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("Authorized Personnel Only", show_alert=True)
+        return
+
+    if not await db.reconcile_stats():
+        await callback.answer("Recount failed, try again later", show_alert=True)
+        return
+
+    await admin_dashboard(callback, throttling, outbound)
+
+
 @router.callback_query(F.data == "admin_categories")
 async def admin_categories(callback: CallbackQuery):
     if not is_admin(callback.from_user.id):
         await callback.answer("Authorized Personnel Only", show_alert=True)
         return
 
-    categories = db.get_categories()
+    categories = await db.get_categories()
 
     buttons = [[InlineKeyboardButton(text="+ Add Category", callback_data="add_category")]]
 
@@ -167,7 +206,7 @@ async def category_emoji_received(message: Message, state: FSMContext):
     data = await state.get_data()
     emoji = message.text.strip() or ""
 
-    db.create_category(data['name'], emoji)
+    await db.create_category(data['name'], emoji)
     await state.clear()
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -176,28 +215,64 @@ async def category_emoji_received(message: Message, state: FSMContext):
     await message.answer(f"Category '{data['name']}' created!", reply_markup=keyboard)
 
 
-@router.callback_query(F.data == "admin_products")
-async def list_products(callback: CallbackQuery):
-    if not is_admin(callback.from_user.id):
-        await callback.answer("Authorized Personnel Only", show_alert=True)
-        return
-
-    products = db.get_products()
-
+def get_admin_products_keyboard(page: dict) -> InlineKeyboardMarkup:
     buttons = [[InlineKeyboardButton(text="+ Add Product", callback_data="add_product")]]
 
-    for prod in products[:10]:
-        stock = db.get_stock_count(prod['id'])
+    for prod in page["items"]:
+        stock = prod.get('available_stock')
+        stock = "?" if stock is None else stock
         buttons.append([InlineKeyboardButton(
             text=f"{prod['name']} (${prod['price']}) [{stock}]",
             callback_data=f"edit_prod_{prod['id']}"
         )])
 
+    nav = []
+    if page["prev"] is not None:
+        nav.append(InlineKeyboardButton(text="< Prev", callback_data=f"admin_prodp_p_{page['prev']}"))
+    if page["next"] is not None:
+        nav.append(InlineKeyboardButton(text="Next >", callback_data=f"admin_prodp_n_{page['next']}"))
+    if nav:
+        buttons.append(nav)
+
     buttons.append([InlineKeyboardButton(text="Back", callback_data="admin_panel")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-    keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
 
-    await callback.message.edit_text(f"Products ({len(products)})\n\nSelect to edit or add new:", reply_markup=keyboard, parse_mode="Markdown")
+async def render_admin_products(callback: CallbackQuery, after_id: int = None, before_id: int = None):
+    page = await db.get_products_page(after_id=after_id, before_id=before_id)
+    stats = await db.get_stats()
+    keyboard = get_admin_products_keyboard(page)
+
+    await callback.message.edit_text(f"Products ({stats['total_products']})\n\nSelect to edit or add new:", reply_markup=keyboard, parse_mode="Markdown")
+
+
+@router.callback_query(F.data == "admin_products")
+async def list_products(callback: CallbackQuery):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("Authorized Personnel Only", show_alert=True)
+        return
+
+    await render_admin_products(callback)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("admin_prodp_"))
+async def paginate_admin_products(callback: CallbackQuery):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("Authorized Personnel Only", show_alert=True)
+        return
+
+    try:
+        _, _, direction, cursor = callback.data.split("_")
+        cursor = int(cursor)
+    except ValueError:
+        await callback.answer("Invalid page", show_alert=True)
+        return
+
+    if direction == "p":
+        await render_admin_products(callback, before_id=cursor)
+    else:
+        await render_admin_products(callback, after_id=cursor)
     await callback.answer()
 
 
@@ -207,7 +282,7 @@ async def start_add_product(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Authorized Personnel Only", show_alert=True)
         return
 
-    categories = db.get_categories()
+    categories = await db.get_categories()
 
     if not categories:
         await callback.answer("Create a category first!", show_alert=True)
@@ -308,7 +383,7 @@ async def product_type_selected(callback: CallbackQuery, state: FSMContext):
     product_type = callback.data.split("_")[2]
     data = await state.get_data()
 
-    product = db.create_product(
+    product = await db.create_product(
         category_id=data['category_id'],
         name=data['name'],
         price=data['price'],
@@ -343,12 +418,12 @@ async def edit_product_menu(callback: CallbackQuery):
         await callback.answer("Invalid product", show_alert=True)
         return
 
-    product = db.get_product(prod_id)
+    product = await db.get_product(prod_id)
     if not product:
         await callback.answer("Product not found", show_alert=True)
         return
 
-    stock_count = db.get_stock_count(prod_id)
+    stock_count = product.get('available_stock')
     product_type = product.get('product_type', 'key')
     type_label = PRODUCT_TYPES.get(product_type, product_type)
 
@@ -356,7 +431,7 @@ async def edit_product_menu(callback: CallbackQuery):
         f"Editing: {product['name']}\n\n"
         f"Price: ${product['price']}\n"
         f"Type: {type_label}\n"
-        f"Stock: {stock_count} items\n"
+        f"Stock: {'unknown' if stock_count is None else stock_count} items\n"
         f"Description: {product.get('description', 'None')[:100]}\n"
     )
 
@@ -382,21 +457,10 @@ async def delete_product(callback: CallbackQuery):
         await callback.answer("Invalid product", show_alert=True)
         return
 
-    db.delete_product(prod_id)
+    await db.delete_product(prod_id)
     await callback.answer("Product deleted")
 
-    products = db.get_products()
-    buttons = [[InlineKeyboardButton(text="+ Add Product", callback_data="add_product")]]
-    for prod in products[:10]:
-        stock = db.get_stock_count(prod['id'])
-        buttons.append([InlineKeyboardButton(
-            text=f"{prod['name']} (${prod['price']}) [{stock}]",
-            callback_data=f"edit_prod_{prod['id']}"
-        )])
-    buttons.append([InlineKeyboardButton(text="Back", callback_data="admin_panel")])
-    keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
-
-    await callback.message.edit_text(f"Products ({len(products)})", reply_markup=keyboard, parse_mode="Markdown")
+    await render_admin_products(callback)
 
 
 @router.callback_query(F.data.startswith("add_stock_"))
@@ -411,7 +475,7 @@ async def start_add_stock(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Invalid product", show_alert=True)
         return
 
-    product = db.get_product(prod_id)
+    product = await db.get_product(prod_id)
     product_type = product.get('product_type', 'key') if product else 'key'
 
     hints = {
@@ -441,7 +505,7 @@ async def receive_stock_keys(message: Message, state: FSMContext):
     keys = [k.strip() for k in message.text.split('\n') if k.strip()]
 
     if keys:
-        count = db.add_stock(prod_id, keys)
+        count = await db.add_stock(prod_id, keys)
         await message.answer(f"Added {count} keys to stock!")
     else:
         await message.answer("No valid keys found.")
@@ -506,7 +570,7 @@ async def coupon_discount_received(message: Message, state: FSMContext):
 
     data = await state.get_data()
 
-    db.create_coupon(data['code'], discount_percent=discount)
+    await db.create_coupon(data['code'], discount_percent=discount)
     await state.clear()
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -523,7 +587,7 @@ async def admin_tickets(callback: CallbackQuery):
         await callback.answer("Authorized Personnel Only", show_alert=True)
         return
 
-    tickets = db.get_open_tickets()
+    tickets = await db.get_open_tickets()
 
     if not tickets:
         text = "No open support tickets."
@@ -563,7 +627,7 @@ async def view_ticket_admin(callback: CallbackQuery):
         await callback.answer("Invalid ticket", show_alert=True)
         return
 
-    ticket = db.get_ticket(ticket_id)
+    ticket = await db.get_ticket(ticket_id)
     if not ticket:
         await callback.answer("Ticket not found", show_alert=True)
         return
@@ -597,10 +661,10 @@ async def close_ticket(callback: CallbackQuery):
         await callback.answer("Invalid ticket", show_alert=True)
         return
 
-    db.update_ticket_status(ticket_id, "closed")
+    await db.update_ticket_status(ticket_id, "closed")
     await callback.answer("Ticket closed")
 
-    tickets = db.get_open_tickets()
+    tickets = await db.get_open_tickets()
     text = f"Open Tickets ({len(tickets)})" if tickets else "No open tickets"
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -644,7 +708,7 @@ async def receive_welcome_text(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    db.set_setting("welcome_message", message.text)
+    await db.set_setting("welcome_message", message.text)
     await state.clear()
     await message.answer("Welcome message updated!")
 
@@ -668,7 +732,7 @@ async def receive_welcome_image(message: Message, state: FSMContext):
 
     if message.photo:
         photo = message.photo[-1]
-        db.set_setting("welcome_image", photo.file_id)
+        await db.set_setting("welcome_image", photo.file_id)
         await message.answer("Welcome image updated!")
     else:
         await message.answer("Please send an image file")
@@ -42,9 +42,8 @@ def get_cart_keyboard(cart_items: list) -> InlineKeyboardMarkup:
 @router.callback_query(F.data == "cart_view")
 async def view_cart(callback: CallbackQuery):
     user_id = callback.from_user.id
-    db.get_or_create_user(user_id)
 
-    cart = db.get_cart(user_id)
+    cart = await db.get_cart(user_id)
 
     if not cart:
         keyboard = get_empty_cart_keyboard()
@@ -99,19 +98,20 @@ async def increase_cart_item(callback: CallbackQuery):
 
     user_id = callback.from_user.id
 
-    stock = db.get_stock_count(prod_id)
-    cart = db.get_cart(user_id)
+    cart = await db.get_cart(user_id)
     current_qty = 0
+    stock = 0
     for item in cart:
         if item["product_id"] == prod_id:
             current_qty = item["quantity"]
+            stock = (item.get("products") or {}).get("available_stock")
             break
 
-    if current_qty >= stock:
+    if stock is not None and current_qty >= stock:
         await callback.answer("Not enough stock available", show_alert=True)
         return
 
-    db.add_to_cart(user_id, prod_id, 1)
+    await db.add_to_cart(user_id, prod_id, 1)
     await view_cart(callback)
 
 
@@ -125,7 +125,7 @@ async def decrease_cart_item(callback: CallbackQuery):
 
     user_id = callback.from_user.id
 
-    cart = db.get_cart(user_id)
+    cart = await db.get_cart(user_id)
     current_qty = 0
     for item in cart:
         if item["product_id"] == prod_id:
@@ -133,9 +133,9 @@ async def decrease_cart_item(callback: CallbackQuery):
             break
 
     if current_qty <= 1:
-        db.remove_from_cart(user_id, prod_id)
+        await db.remove_from_cart(user_id, prod_id)
     else:
-        db.update_cart_quantity(user_id, prod_id, current_qty - 1)
+        await db.update_cart_quantity(user_id, prod_id, current_qty - 1)
 
     await view_cart(callback)
 
@@ -149,7 +149,7 @@ async def remove_cart_item(callback: CallbackQuery):
         return
 
     user_id = callback.from_user.id
-    db.remove_from_cart(user_id, prod_id)
+    await db.remove_from_cart(user_id, prod_id)
 
     await callback.answer("Item removed")
     await view_cart(callback)
@@ -164,25 +164,24 @@ async def add_to_cart(callback: CallbackQuery):
         return
 
     user_id = callback.from_user.id
-    db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
 
-    stock = db.get_stock_count(prod_id)
-    if stock <= 0:
+    stock = await db.get_stock_count(prod_id)
+    if stock is not None and stock <= 0:
         await callback.answer("Out of Stock!", show_alert=True)
         return
 
-    cart = db.get_cart(user_id)
+    cart = await db.get_cart(user_id)
     current_qty = 0
     for item in cart:
         if item["product_id"] == prod_id:
             current_qty = item["quantity"]
             break
 
-    if current_qty >= stock:
+    if stock is not None and current_qty >= stock:
         await callback.answer("Cannot add more - not enough stock", show_alert=True)
         return
 
-    db.add_to_cart(user_id, prod_id, 1)
+    await db.add_to_cart(user_id, prod_id, 1)
     await callback.answer("Added to cart!", show_alert=False)
 
 
@@ -1,7 +1,12 @@
-from aiogram import Router, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, Message
+from aiogram import Bot, Router, F
+from aiogram.types import (
+    CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, Message,
+    InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+)
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from src.bot.media import send_cached_photo
+from src.config import settings
 from src.database import db
 
 router = Router()
@@ -17,6 +22,8 @@ PRODUCT_DETAIL_TEMPLATE = (
     "Status: {status}\n"
 )
 
+DEFAULT_PRODUCT_IMAGE = "https://images.pexels.com/photos/5632402/pexels-photo-5632402.jpeg?auto=compress&cs=tinysrgb&w=400"
+
 PRODUCT_TYPE_LABELS = {
     "key": "Digital Key",
     "credentials": "Account Login",
@@ -42,7 +49,7 @@ def get_categories_keyboard(categories: list) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def get_products_keyboard(products: list, cat_id: int) -> InlineKeyboardMarkup:
+def get_products_keyboard(products: list, cat_id: int, prev_cursor: int = None, next_cursor: int = None) -> InlineKeyboardMarkup:
     buttons = [
         [InlineKeyboardButton(
             text=f"{p['name']} - ${p['price']}",
@@ -50,6 +57,13 @@ def get_products_keyboard(products: list, cat_id: int) -> InlineKeyboardMarkup:
         )]
         for p in products
     ]
+    nav = []
+    if prev_cursor is not None:
+        nav.append(InlineKeyboardButton(text="< Prev", callback_data=f"catp_{cat_id}_p_{prev_cursor}"))
+    if next_cursor is not None:
+        nav.append(InlineKeyboardButton(text="Next >", callback_data=f"catp_{cat_id}_n_{next_cursor}"))
+    if nav:
+        buttons.append(nav)
     buttons.append([InlineKeyboardButton(text="Back", callback_data="catalog_main")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
@@ -68,7 +82,7 @@ def get_product_detail_keyboard(prod_id: int, cat_id: int, in_wishlist: bool = F
 
 @router.callback_query(F.data == "catalog_main")
 async def show_categories(callback: CallbackQuery):
-    categories = db.get_categories()
+    categories = await db.get_categories()
 
     if not categories:
         await callback.answer(NO_CATEGORIES, show_alert=True)
@@ -96,12 +110,32 @@ async def show_products(callback: CallbackQuery):
         await callback.answer("Invalid category", show_alert=True)
         return
 
-    category = db.get_category(cat_id)
+    await render_products_page(callback, cat_id)
+
+
+@router.callback_query(F.data.startswith("catp_"))
+async def paginate_products(callback: CallbackQuery):
+    try:
+        _, cat_id, direction, cursor = callback.data.split("_")
+        cat_id, cursor = int(cat_id), int(cursor)
+    except ValueError:
+        await callback.answer("Invalid page", show_alert=True)
+        return
+
+    if direction == "p":
+        await render_products_page(callback, cat_id, before_id=cursor)
+    else:
+        await render_products_page(callback, cat_id, after_id=cursor)
+
+
+async def render_products_page(callback: CallbackQuery, cat_id: int, after_id: int = None, before_id: int = None):
+    category = await db.get_category(cat_id)
     if not category:
         await callback.answer("Category not found", show_alert=True)
         return
 
-    products = db.get_products(category_id=cat_id)
+    page = await db.get_products_page(category_id=cat_id, after_id=after_id, before_id=before_id)
+    products = page["items"]
 
     if not products:
         text = f"No products found in {category['name']}"
@@ -119,7 +153,7 @@ async def show_products(callback: CallbackQuery):
         await callback.answer()
         return
 
-    keyboard = get_products_keyboard(products, cat_id)
+    keyboard = get_products_keyboard(products, cat_id, page["prev"], page["next"])
     text = f"{category['name']}\nSelect a product:"
 
     try:
@@ -134,29 +168,16 @@ async def show_products(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("prod_"))
-async def show_product_detail(callback: CallbackQuery):
-    try:
-        prod_id = int(callback.data.split("_")[1])
-    except (ValueError, IndexError):
-        await callback.answer("Invalid product", show_alert=True)
-        return
-
-    product = db.get_product(prod_id)
-
-    if not product:
-        await callback.answer("Product not found", show_alert=True)
-        return
-
-    stock = db.get_stock_count(prod_id)
-    stock_status = f"In Stock ({stock})" if stock > 0 else "Out of Stock"
+def format_product_detail(product: dict) -> str:
+    stock = product.get('available_stock')
+    if stock is None:
+        stock_status = "Availability unknown"
+    else:
+        stock_status = f"In Stock ({stock})" if stock > 0 else "Out of Stock"
     product_type = product.get('product_type', 'key')
     type_label = PRODUCT_TYPE_LABELS.get(product_type, "Digital Product")
 
-    user_id = callback.from_user.id
-    in_wishlist = db.is_in_wishlist(user_id, prod_id)
-
-    text = PRODUCT_DETAIL_TEMPLATE.format(
+    return PRODUCT_DETAIL_TEMPLATE.format(
         name=product['name'],
         description=product.get('description', 'No description'),
         price=product['price'],
@@ -164,27 +185,39 @@ async def show_product_detail(callback: CallbackQuery):
         status=stock_status
     )
 
-    keyboard = get_product_detail_keyboard(prod_id, product['category_id'], in_wishlist)
 
-    image_url = product.get("image_url")
-    if not image_url:
-        image_url = "https://images.pexels.com/photos/5632402/pexels-photo-5632402.jpeg?auto=compress&cs=tinysrgb&w=400"
+async def send_product_detail(message: Message, user_id: int, product: dict) -> None:
+    in_wishlist = await db.is_in_wishlist(user_id, product['id'])
+    text = format_product_detail(product)
+    keyboard = get_product_detail_keyboard(product['id'], product['category_id'], in_wishlist)
+    image_url = product.get("image_url") or DEFAULT_PRODUCT_IMAGE
 
     try:
-        await callback.message.delete()
+        await send_cached_photo(message, image_url, text, keyboard)
     except Exception:
-        pass
+        await message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+
 
+@router.callback_query(F.data.startswith("prod_"))
+async def show_product_detail(callback: CallbackQuery):
     try:
-        await callback.message.answer_photo(
-            photo=image_url,
-            caption=text,
-            reply_markup=keyboard,
-            parse_mode="Markdown"
-        )
+        prod_id = int(callback.data.split("_")[1])
+    except (ValueError, IndexError):
+        await callback.answer("Invalid product", show_alert=True)
+        return
+
+    product = await db.get_product(prod_id)
+
+    if not product:
+        await callback.answer("Product not found", show_alert=True)
+        return
+
+    try:
+        await callback.message.delete()
     except Exception:
-        await callback.message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+        pass
 
+    await send_product_detail(callback.message, callback.from_user.id, product)
     await callback.answer()
 
 
@@ -204,7 +237,7 @@ async def process_search(message: Message, state: FSMContext):
         await message.answer("Search query too short. Please enter at least 2 characters.")
         return
 
-    products = db.search_products(query)
+    products = await db.search_products(query)
 
     if not products:
         keyboard = InlineKeyboardMarkup(
@@ -218,7 +251,7 @@ async def process_search(message: Message, state: FSMContext):
             text=f"{p['name']} - ${p['price']}",
             callback_data=f"prod_{p['id']}"
         )]
-        for p in products[:10]
+        for p in products
     ]
     buttons.append([InlineKeyboardButton(text="Back to Catalog", callback_data="catalog_main")])
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
@@ -236,32 +269,65 @@ async def toggle_wishlist(callback: CallbackQuery):
 
     user_id = callback.from_user.id
 
-    if db.is_in_wishlist(user_id, prod_id):
-        db.remove_from_wishlist(user_id, prod_id)
+    if await db.is_in_wishlist(user_id, prod_id):
+        await db.remove_from_wishlist(user_id, prod_id)
         await callback.answer("Removed from wishlist")
     else:
-        db.add_to_wishlist(user_id, prod_id)
+        await db.add_to_wishlist(user_id, prod_id)
         await callback.answer("Added to wishlist")
 
-    product = db.get_product(prod_id)
+    product = await db.get_product(prod_id)
     if product:
-        in_wishlist = db.is_in_wishlist(user_id, prod_id)
+        in_wishlist = await db.is_in_wishlist(user_id, prod_id)
         keyboard = get_product_detail_keyboard(prod_id, product['category_id'], in_wishlist)
-
-        stock = db.get_stock_count(prod_id)
-        stock_status = f"In Stock ({stock})" if stock > 0 else "Out of Stock"
-        product_type = product.get('product_type', 'key')
-        type_label = PRODUCT_TYPE_LABELS.get(product_type, "Digital Product")
-
-        text = PRODUCT_DETAIL_TEMPLATE.format(
-            name=product['name'],
-            description=product.get('description', 'No description'),
-            price=product['price'],
-            type=type_label,
-            status=stock_status
-        )
+        text = format_product_detail(product)
 
         try:
             await callback.message.edit_caption(caption=text, reply_markup=keyboard, parse_mode="Markdown")
         except Exception:
             pass
+
+
+@router.inline_query()
+async def inline_search(inline_query: InlineQuery, bot: Bot):
+    query = inline_query.query.strip()
+    try:
+        offset = max(int(inline_query.offset or 0), 0)
+    except ValueError:
+        offset = 0
+
+    page_size = settings.INLINE_PAGE_SIZE
+    limit = min(offset + page_size + 1, settings.INLINE_MAX_RESULTS)
+
+    if len(query) >= 2:
+        products = await db.search_products(query, limit=limit)
+    else:
+        products = (await db.get_products_page(limit=limit))["items"]
+
+    page = products[offset:offset + page_size]
+    has_more = len(products) > offset + page_size and offset + page_size < settings.INLINE_MAX_RESULTS
+
+    me = await bot.me()
+    results = [
+        InlineQueryResultArticle(
+            id=str(p['id']),
+            title=p['name'],
+            description=f"${p['price']} - {PRODUCT_TYPE_LABELS.get(p.get('product_type', 'key'), 'Digital Product')}",
+            thumbnail_url=p.get("image_url") or DEFAULT_PRODUCT_IMAGE,
+            input_message_content=InputTextMessageContent(
+                message_text=format_product_detail(p),
+                parse_mode="Markdown"
+            ),
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
+                InlineKeyboardButton(text="Open in Bot", url=f"https://t.me/{me.username}?start=prod_{p['id']}")
+            ]])
+        )
+        for p in page
+    ]
+
+    await inline_query.answer(
+        results,
+        cache_time=settings.INLINE_CACHE_TIME,
+        is_personal=False,
+        next_offset=str(offset + page_size) if has_more else ""
+    )
@@ -1,4 +1,5 @@
 import asyncio
+from itertools import groupby
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, Message
 from aiogram.fsm.context import FSMContext
@@ -53,11 +54,24 @@ def get_order_complete_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+def build_delivery_message(delivered: list) -> str:
+    delivery_msg = ""
+
+    for _, rows in groupby(delivered, key=lambda row: row['product_id']):
+        rows = list(rows)
+        delivery_msg += f"{rows[0]['product_name']}\n"
+        for row in rows:
+            formatted = db.format_delivery_item({"product_type": row['product_type']}, row['data'])
+            delivery_msg += f"{formatted}\n"
+        delivery_msg += "\n"
+
+    return delivery_msg
+
+
 @router.callback_query(F.data == "checkout_start")
-async def start_checkout(callback: CallbackQuery, state: FSMContext):
+async def start_checkout(callback: CallbackQuery, state: FSMContext, user: dict):
     user_id = callback.from_user.id
-    user = db.get_or_create_user(user_id)
-    cart = db.get_cart(user_id)
+    cart = await db.get_cart(user_id)
 
     if not cart:
         await callback.answer("Cart is empty!", show_alert=True)
@@ -72,9 +86,9 @@ async def start_checkout(callback: CallbackQuery, state: FSMContext):
             continue
 
         qty = item["quantity"]
-        stock = db.get_stock_count(product['id'])
+        stock = product.get('available_stock')
 
-        if stock < qty:
+        if stock is not None and stock < qty:
             await callback.answer(f"Not enough stock for {product['name']}!", show_alert=True)
             return
 
@@ -88,7 +102,7 @@ async def start_checkout(callback: CallbackQuery, state: FSMContext):
     discount_line = ""
 
     if coupon_code:
-        coupon, error = db.validate_coupon(coupon_code, subtotal)
+        coupon, error = await db.validate_coupon(coupon_code, subtotal)
         if coupon:
             discount = db.calculate_discount(coupon, subtotal)
             discount_line = f"Discount ({coupon_code}): -${discount:.2f}\n"
@@ -125,9 +139,9 @@ async def apply_coupon_start(callback: CallbackQuery, state: FSMContext):
 async def process_coupon(message: Message, state: FSMContext):
     code = message.text.strip().upper()
     user_id = message.from_user.id
-    cart_total = db.get_cart_total(user_id)
+    cart_total = await db.get_cart_total(user_id)
 
-    coupon, error = db.validate_coupon(code, cart_total)
+    coupon, error = await db.validate_coupon(code, cart_total)
 
     if error:
         await message.answer(f"Invalid coupon: {error}")
@@ -149,87 +163,19 @@ async def process_coupon(message: Message, state: FSMContext):
 @router.callback_query(F.data == "pay_credits")
 async def process_payment_credits(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
-    user = db.get_user(user_id)
-    cart = db.get_cart(user_id)
-
-    if not cart:
-        await callback.answer("Cart expired", show_alert=True)
-        return
-
-    subtotal = 0
-    purchased_items = []
-
-    for item in cart:
-        product = item.get("products")
-        if not product:
-            continue
-        qty = item["quantity"]
-        subtotal += float(product['price']) * qty
-        purchased_items.append({"product": product, "qty": qty, "product_id": product["id"]})
-
     state_data = await state.get_data()
     coupon_code = state_data.get("coupon_code")
-    discount = 0
 
-    if coupon_code:
-        coupon, _ = db.validate_coupon(coupon_code, subtotal)
-        if coupon:
-            discount = db.calculate_discount(coupon, subtotal)
-
-    total = subtotal - discount
-    balance = float(user['balance'])
+    delivered, error = await db.checkout(user_id, coupon_code, "balance")
 
-    if balance < total:
-        await callback.answer("Insufficient balance!", show_alert=True)
+    if error:
+        await callback.answer(error, show_alert=True)
         return
 
-    for item in purchased_items:
-        stock = db.get_stock_count(item['product_id'])
-        if stock < item['qty']:
-            await callback.answer(f"Insufficient stock for {item['product']['name']}!", show_alert=True)
-            return
-
-    order = db.create_order(user_id, total, discount, coupon_code, "balance")
-
-    delivery_msg = ""
-
-    for item in purchased_items:
-        prod = item['product']
-        qty = item['qty']
-
-        stock_items = db.get_available_stock(prod['id'], qty)
-
-        if stock_items:
-            stock_ids = [s['id'] for s in stock_items]
-            db.mark_stock_sold(stock_ids, user_id)
-
-            delivery_msg += f"{prod['name']}\n"
-            for s in stock_items:
-                formatted = db.format_delivery_item(prod, s['data'])
-                delivery_msg += f"{formatted}\n"
-                db.add_order_item(order['id'], prod['id'], s['id'], float(prod['price']))
-        else:
-            delivery_msg += f"{prod['name']}\n"
-            delivery_msg += "Auto-delivery failed (Contact Support)\n"
-
-        delivery_msg += "\n"
-
-    db.deduct_balance(user_id, total, f"Purchase - Order #{order['id']}")
-
-    new_total_spent = float(user['total_spent']) + total
-    db.update_user(user_id, {"total_spent": new_total_spent})
-    db.update_user_tier(user_id)
-
-    db.process_referral_commission(user_id, total)
-
-    if coupon_code:
-        db.use_coupon(coupon_code)
-
-    db.clear_cart(user_id)
     await state.clear()
 
-    new_user = db.get_user(user_id)
-    new_balance = float(new_user['balance'])
+    delivery_msg = build_delivery_message(delivered)
+    new_balance = float(delivered[0]['balance'])
 
     text = PAYMENT_SUCCESS.format(delivery_msg=delivery_msg, balance=new_balance)
     keyboard = get_order_complete_keyboard()
@@ -244,78 +190,19 @@ async def process_payment_mock(callback: CallbackQuery, state: FSMContext):
     await asyncio.sleep(1)
 
     user_id = callback.from_user.id
-    user = db.get_user(user_id)
-    cart = db.get_cart(user_id)
-
-    if not cart:
-        await callback.answer("Cart expired", show_alert=True)
-        return
-
-    subtotal = 0
-    purchased_items = []
-
-    for item in cart:
-        product = item.get("products")
-        if not product:
-            continue
-        qty = item["quantity"]
-        subtotal += float(product['price']) * qty
-        purchased_items.append({"product": product, "qty": qty, "product_id": product["id"]})
-
     state_data = await state.get_data()
     coupon_code = state_data.get("coupon_code")
-    discount = 0
-
-    if coupon_code:
-        coupon, _ = db.validate_coupon(coupon_code, subtotal)
-        if coupon:
-            discount = db.calculate_discount(coupon, subtotal)
-
-    total = subtotal - discount
-
-    for item in purchased_items:
-        stock = db.get_stock_count(item['product_id'])
-        if stock < item['qty']:
-            await callback.answer(f"Insufficient stock for {item['product']['name']}!", show_alert=True)
-            return
-
-    order = db.create_order(user_id, total, discount, coupon_code, "external")
-
-    delivery_msg = ""
-
-    for item in purchased_items:
-        prod = item['product']
-        qty = item['qty']
-
-        stock_items = db.get_available_stock(prod['id'], qty)
 
-        if stock_items:
-            stock_ids = [s['id'] for s in stock_items]
-            db.mark_stock_sold(stock_ids, user_id)
+    delivered, error = await db.checkout(user_id, coupon_code, "external")
 
-            delivery_msg += f"{prod['name']}\n"
-            for s in stock_items:
-                formatted = db.format_delivery_item(prod, s['data'])
-                delivery_msg += f"{formatted}\n"
-                db.add_order_item(order['id'], prod['id'], s['id'], float(prod['price']))
-        else:
-            delivery_msg += f"{prod['name']}\n"
-            delivery_msg += "Auto-delivery failed (Contact Support)\n"
-
-        delivery_msg += "\n"
-
-    new_total_spent = float(user['total_spent']) + total
-    db.update_user(user_id, {"total_spent": new_total_spent})
-    db.update_user_tier(user_id)
-
-    db.process_referral_commission(user_id, total)
-
-    if coupon_code:
-        db.use_coupon(coupon_code)
+    if error:
+        await callback.answer(error, show_alert=True)
+        return
 
-    db.clear_cart(user_id)
     await state.clear()
 
+    delivery_msg = build_delivery_message(delivered)
+
     text = f"Payment Received!\n\n{delivery_msg}"
     keyboard = get_order_complete_keyboard()
 
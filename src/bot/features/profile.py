@@ -20,6 +20,8 @@ PROFILE_TEMPLATE = (
 ORDER_HISTORY_TITLE = "Recent Orders\n\n"
 ORDER_ITEM_TEMPLATE = "Order #{order_id}\n   {product_name} - ${total:.2f}\n   Status: {status}\n\n"
 
+HISTORY_PAGE_SIZE = 10
+
 
 def get_profile_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -30,18 +32,19 @@ def get_profile_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
-def get_order_history_keyboard() -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="Back to Profile", callback_data="profile_view")]
-    ])
+def get_history_keyboard(older_callback: str = None) -> InlineKeyboardMarkup:
+    buttons = []
+    if older_callback:
+        buttons.append([InlineKeyboardButton(text="Older >", callback_data=older_callback)])
+    buttons.append([InlineKeyboardButton(text="Back to Profile", callback_data="profile_view")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
 @router.callback_query(F.data == "profile_view")
-async def view_profile(callback: CallbackQuery):
+async def view_profile(callback: CallbackQuery, user: dict):
     user_id = callback.from_user.id
-    user = db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
 
-    orders = db.get_user_orders(user_id)
+    total_orders = await db.get_user_order_count(user_id)
     tier = user.get('tier', 'bronze')
     tier_icon = TIER_EMOJI.get(tier, "")
 
@@ -56,7 +59,7 @@ async def view_profile(callback: CallbackQuery):
         tier=tier.title(),
         balance=float(user.get('balance', 0.0)),
         total_spent=float(user.get('total_spent', 0.0)),
-        total_orders=len(orders),
+        total_orders=total_orders,
         joined_at=joined_at or 'Recently'
     )
 
@@ -73,13 +76,31 @@ async def view_profile(callback: CallbackQuery):
 
 @router.callback_query(F.data == "order_history")
 async def view_order_history(callback: CallbackQuery):
+    await render_order_history(callback)
+
+
+@router.callback_query(F.data.startswith("orders_older_"))
+async def view_older_orders(callback: CallbackQuery):
+    try:
+        before_id = int(callback.data.split("_")[2])
+    except (ValueError, IndexError):
+        await callback.answer("Invalid page", show_alert=True)
+        return
+
+    await render_order_history(callback, before_id)
+
+
+async def render_order_history(callback: CallbackQuery, before_id: int = None):
     user_id = callback.from_user.id
-    orders = db.get_user_orders(user_id, limit=10)
+    orders = await db.get_order_history(user_id, limit=HISTORY_PAGE_SIZE + 1, before_id=before_id)
 
     if not orders:
         await callback.answer("No orders found", show_alert=True)
         return
 
+    has_older = len(orders) > HISTORY_PAGE_SIZE
+    orders = orders[:HISTORY_PAGE_SIZE]
+
     text = ORDER_HISTORY_TITLE
 
     for order in orders:
@@ -100,7 +121,7 @@ async def view_order_history(callback: CallbackQuery):
             status=order.get('status', 'unknown').title()
         )
 
-    keyboard = get_order_history_keyboard()
+    keyboard = get_history_keyboard(f"orders_older_{orders[-1]['id']}" if has_older else None)
 
     await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="Markdown")
     await callback.answer()
@@ -108,13 +129,31 @@ async def view_order_history(callback: CallbackQuery):
 
 @router.callback_query(F.data == "transactions")
 async def view_transactions(callback: CallbackQuery):
+    await render_transactions(callback)
+
+
+@router.callback_query(F.data.startswith("tx_older_"))
+async def view_older_transactions(callback: CallbackQuery):
+    try:
+        before_id = int(callback.data.split("_")[2])
+    except (ValueError, IndexError):
+        await callback.answer("Invalid page", show_alert=True)
+        return
+
+    await render_transactions(callback, before_id)
+
+
+async def render_transactions(callback: CallbackQuery, before_id: int = None):
     user_id = callback.from_user.id
-    transactions = db.get_transactions(user_id, limit=10)
+    transactions = await db.get_transactions(user_id, limit=HISTORY_PAGE_SIZE + 1, before_id=before_id)
 
     if not transactions:
         await callback.answer("No transactions found", show_alert=True)
         return
 
+    has_older = len(transactions) > HISTORY_PAGE_SIZE
+    transactions = transactions[:HISTORY_PAGE_SIZE]
+
     text = "Transaction History\n\n"
 
     for tx in transactions:
@@ -128,9 +167,7 @@ async def view_transactions(callback: CallbackQuery):
             text += f"   {tx['description'][:30]}\n"
         text += f"   {date}\n\n"
 
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="Back to Profile", callback_data="profile_view")]
-    ])
+    keyboard = get_history_keyboard(f"tx_older_{transactions[-1]['id']}" if has_older else None)
 
     await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="Markdown")
     await callback.answer()
@@ -39,9 +39,6 @@ def get_referral_info_keyboard() -> InlineKeyboardMarkup:
 
 @router.callback_query(F.data == "referrals")
 async def referral_menu(callback: CallbackQuery):
-    user_id = callback.from_user.id
-    db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
-
     keyboard = get_referral_menu_keyboard()
 
     try:
@@ -56,9 +53,8 @@ async def referral_menu(callback: CallbackQuery):
 @router.callback_query(F.data == "my_referrals")
 async def my_referrals(callback: CallbackQuery):
     user_id = callback.from_user.id
-    db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
 
-    stats = db.get_referral_stats(user_id)
+    stats = await db.get_referral_stats(user_id)
 
     text = REFERRAL_INFO.format(
         code=stats['referral_code'],
@@ -73,10 +69,7 @@ async def my_referrals(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "get_referral_link")
-async def get_referral_link(callback: CallbackQuery):
-    user_id = callback.from_user.id
-    user = db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
-
+async def get_referral_link(callback: CallbackQuery, user: dict):
     referral_code = user.get('referral_code')
 
     bot_info = await callback.bot.get_me()
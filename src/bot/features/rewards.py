@@ -1,5 +1,5 @@
 import random
-from datetime import datetime, date
+from datetime import datetime
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from src.database import db
@@ -33,6 +33,7 @@ SPIN_RESULT_NOTHING = (
 )
 
 SPIN_ALREADY = "You already spun today! Come back tomorrow."
+SPIN_FAILED = "Couldn't record your spin right now. Please try again in a moment."
 
 
 def get_daily_spin_keyboard() -> InlineKeyboardMarkup:
@@ -50,10 +51,7 @@ def get_spin_result_keyboard() -> InlineKeyboardMarkup:
 
 
 @router.callback_query(F.data == "daily_spin")
-async def daily_spin_menu(callback: CallbackQuery):
-    user_id = callback.from_user.id
-    user = db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
-
+async def daily_spin_menu(callback: CallbackQuery, user: dict):
     tier = user.get('tier', 'bronze')
     tier_info = TIER_INFO.get(tier, TIER_INFO['bronze'])
 
@@ -75,17 +73,8 @@ async def daily_spin_menu(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "spin_now")
-async def spin_now(callback: CallbackQuery):
+async def spin_now(callback: CallbackQuery, user: dict):
     user_id = callback.from_user.id
-    user = db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
-
-    transactions = db.get_transactions(user_id, limit=50)
-    today = date.today().isoformat()
-
-    for tx in transactions:
-        if tx.get('type') == 'spin' and tx.get('created_at', '')[:10] == today:
-            await callback.answer(SPIN_ALREADY, show_alert=True)
-            return
 
     tier = user.get('tier', 'bronze')
 
@@ -123,16 +112,17 @@ async def spin_now(callback: CallbackQuery):
             reward_amount = amount
             break
 
+    claimed = await db.claim_daily_spin(user_id, reward_amount)
+    if claimed is None:
+        await callback.answer(SPIN_FAILED, show_alert=True)
+        return
+    if not claimed:
+        await callback.answer(SPIN_ALREADY, show_alert=True)
+        return
+
     if reward_amount > 0:
-        db.add_balance(user_id, reward_amount, f"Daily spin reward", "spin")
         text = SPIN_RESULT_CREDITS.format(reward=reward_amount)
     else:
-        db.client.table("transactions").insert({
-            "user_id": user_id,
-            "type": "spin",
-            "amount": 0,
-            "description": "Daily spin - no win"
-        }).execute()
         text = SPIN_RESULT_NOTHING
 
     keyboard = get_spin_result_keyboard()
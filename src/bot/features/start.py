@@ -1,6 +1,9 @@
+from typing import Optional
 from aiogram import Router, F
 from aiogram.filters import CommandStart
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from src.bot.features.catalog import send_product_detail
+from src.bot.media import send_cached_photo
 from src.database import db
 from src.logger import logger
 
@@ -9,8 +12,8 @@ router = Router()
 TIER_EMOJI = {"bronze": "", "silver": "", "gold": "", "platinum": ""}
 
 
-def get_welcome_text(first_name: str, user_id: int, tier: str = "bronze") -> str:
-    custom_text = db.get_setting("welcome_message")
+async def get_welcome_text(first_name: str, user_id: int, tier: str = "bronze") -> str:
+    custom_text = await db.get_setting("welcome_message")
     tier_icon = TIER_EMOJI.get(tier, "")
 
     if custom_text and custom_text != "Welcome to NanoToolz! Browse our catalog to find what you need.":
@@ -55,50 +58,53 @@ def get_main_keyboard() -> InlineKeyboardMarkup:
 
 
 @router.message(CommandStart())
-async def start_command(message: Message):
+async def start_command(message: Message, user: Optional[dict] = None):
     logger.info(f"Received /start from user {message.from_user.id}")
     user_id = message.from_user.id
     username = message.from_user.username
     first_name = message.from_user.first_name or "User"
 
     referral_code = None
+    product_id = None
     if message.text and len(message.text.split()) > 1:
-        referral_code = message.text.split()[1]
-
-    user = db.get_user(user_id)
+        payload = message.text.split()[1]
+        if payload.startswith("prod_") and payload[5:].isdigit():
+            product_id = int(payload[5:])
+        else:
+            referral_code = payload
 
     if not user:
         referred_by = None
         if referral_code:
-            referrer = db.get_user_by_referral_code(referral_code)
+            referrer = await db.get_user_by_referral_code(referral_code)
             if referrer and referrer["id"] != user_id:
                 referred_by = referrer["id"]
                 logger.info(f"User {user_id} referred by {referred_by}")
 
-        user = db.create_user(user_id, username, first_name, referred_by)
+        user = await db.create_user(user_id, username, first_name, referred_by)
         logger.info(f"New user registered: {user_id}")
-    else:
-        db.update_user(user_id, {"username": username, "first_name": first_name})
+    elif user.get("username") != username or user.get("first_name") != first_name:
+        await db.update_user(user_id, {"username": username, "first_name": first_name})
 
     tier = user.get("tier", "bronze")
-    welcome_text = get_welcome_text(first_name, user_id, tier)
+    welcome_text = await get_welcome_text(first_name, user_id, tier)
     keyboard = get_main_keyboard()
 
-    custom_image = db.get_setting("welcome_image")
+    custom_image = await db.get_setting("welcome_image")
 
     if custom_image:
         try:
-            await message.answer_photo(
-                custom_image,
-                caption=welcome_text,
-                reply_markup=keyboard,
-                parse_mode="Markdown"
-            )
+            await send_cached_photo(message, custom_image, welcome_text, keyboard)
         except Exception:
             await message.answer(welcome_text, reply_markup=keyboard, parse_mode="Markdown")
     else:
         await message.answer(welcome_text, reply_markup=keyboard, parse_mode="Markdown")
 
+    if product_id:
+        product = await db.get_product(product_id)
+        if product and product.get("is_active", True):
+            await send_product_detail(message, user_id, product)
+
 
 @router.callback_query(F.data == "back_main")
 async def back_to_main(callback: CallbackQuery):
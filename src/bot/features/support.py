@@ -35,9 +35,8 @@ def get_support_menu_keyboard(has_tickets: bool = False) -> InlineKeyboardMarkup
 @router.callback_query(F.data == "support")
 async def support_menu(callback: CallbackQuery):
     user_id = callback.from_user.id
-    db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
 
-    tickets = db.get_user_tickets(user_id)
+    tickets = await db.get_user_tickets(user_id)
     has_tickets = len(tickets) > 0
 
     keyboard = get_support_menu_keyboard(has_tickets)
@@ -82,8 +81,8 @@ async def receive_message(message: Message, state: FSMContext):
     user_id = message.from_user.id
     data = await state.get_data()
 
-    ticket = db.create_ticket(user_id, data['subject'])
-    db.add_ticket_message(ticket['id'], user_id, message.text, is_admin=False)
+    ticket = await db.create_ticket(user_id, data['subject'])
+    await db.add_ticket_message(ticket['id'], user_id, message.text, is_admin=False)
 
     await state.clear()
 
@@ -103,7 +102,7 @@ async def receive_message(message: Message, state: FSMContext):
 @router.callback_query(F.data == "my_tickets")
 async def my_tickets(callback: CallbackQuery):
     user_id = callback.from_user.id
-    tickets = db.get_user_tickets(user_id)
+    tickets = await db.get_user_tickets(user_id)
 
     if not tickets:
         await callback.answer("No tickets found", show_alert=True)
@@ -135,7 +134,7 @@ async def view_my_ticket(callback: CallbackQuery):
         await callback.answer("Invalid ticket", show_alert=True)
         return
 
-    ticket = db.get_ticket(ticket_id)
+    ticket = await db.get_ticket(ticket_id)
 
     if not ticket:
         await callback.answer("Ticket not found", show_alert=True)
@@ -184,7 +183,7 @@ async def receive_reply(message: Message, state: FSMContext):
     data = await state.get_data()
     ticket_id = data['ticket_id']
 
-    db.add_ticket_message(ticket_id, user_id, message.text, is_admin=False)
+    await db.add_ticket_message(ticket_id, user_id, message.text, is_admin=False)
 
     await state.clear()
 
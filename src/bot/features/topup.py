@@ -96,9 +96,8 @@ async def process_mock_topup(callback: CallbackQuery):
         return
 
     user_id = callback.from_user.id
-    db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
 
-    new_balance = db.add_balance(user_id, amount, f"Topup ${amount}", "topup")
+    new_balance = await db.add_balance(user_id, amount, f"Topup ${amount}", "topup")
 
     text = TOPUP_SUCCESS.format(amount=amount, balance=new_balance)
     keyboard = get_topup_success_keyboard()
@@ -41,9 +41,8 @@ def get_wishlist_keyboard(wishlist_items: list) -> InlineKeyboardMarkup:
 @router.callback_query(F.data == "wishlist")
 async def wishlist_view(callback: CallbackQuery):
     user_id = callback.from_user.id
-    db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
 
-    wishlist = db.get_wishlist(user_id)
+    wishlist = await db.get_wishlist(user_id)
 
     if not wishlist:
         keyboard = get_empty_wishlist_keyboard()
@@ -60,8 +59,11 @@ async def wishlist_view(callback: CallbackQuery):
     for item in wishlist:
         product = item.get("products")
         if product:
-            stock = db.get_stock_count(product['id'])
-            status = "In Stock" if stock > 0 else "Out of Stock"
+            stock = product.get('available_stock')
+            if stock is None:
+                status = "Availability unknown"
+            else:
+                status = "In Stock" if stock > 0 else "Out of Stock"
             text += f"- {product['name']} - ${product['price']} ({status})\n"
 
     keyboard = get_wishlist_keyboard(wishlist)
@@ -84,13 +86,12 @@ async def wishlist_add(callback: CallbackQuery):
         return
 
     user_id = callback.from_user.id
-    db.get_or_create_user(user_id, callback.from_user.username, callback.from_user.first_name)
 
-    if db.is_in_wishlist(user_id, product_id):
+    if await db.is_in_wishlist(user_id, product_id):
         await callback.answer("Already in wishlist", show_alert=False)
         return
 
-    db.add_to_wishlist(user_id, product_id)
+    await db.add_to_wishlist(user_id, product_id)
     await callback.answer("Added to wishlist!", show_alert=False)
 
 
@@ -103,7 +104,7 @@ async def wishlist_del(callback: CallbackQuery):
         return
 
     user_id = callback.from_user.id
-    db.remove_from_wishlist(user_id, product_id)
+    await db.remove_from_wishlist(user_id, product_id)
     await callback.answer("Removed from wishlist")
 
     await wishlist_view(callback)
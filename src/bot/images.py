@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import httpx
+from PIL import Image, ImageOps
+from src.config import settings
+from src.logger import logger
+
+
+def optimize_image(data: bytes, max_size: int, quality: int) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+        return output.getvalue()
+
+
+class ImagePipeline:
+    def __init__(self, cache_dir: str, max_size: int, quality: int, workers: int, max_download_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.quality = quality
+        self.max_download_bytes = max_download_bytes
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.downloads = 0
+        self.processed = 0
+        self.disk_hits = 0
+        self.failures = 0
+
+    def _paths(self, key: str) -> tuple:
+        return os.path.join(self.cache_dir, "sources", key), os.path.join(self.cache_dir, "blobs")
+
+    def _lookup(self, source: str) -> Optional[str]:
+        index_path, blob_dir = self._paths(hashlib.sha256(source.encode()).hexdigest())
+        try:
+            with open(index_path) as f:
+                blob_path = os.path.join(blob_dir, f.read().strip())
+            return blob_path if os.path.exists(blob_path) else None
+        except OSError:
+            return None
+
+    def _store(self, source: str, data: bytes) -> str:
+        index_path, blob_dir = self._paths(hashlib.sha256(source.encode()).hexdigest())
+        blob_name = f"{hashlib.sha256(data).hexdigest()}.jpg"
+        blob_path = os.path.join(blob_dir, blob_name)
+        os.makedirs(blob_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        if not os.path.exists(blob_path):
+            tmp_path = f"{blob_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, blob_path)
+        with open(index_path, "w") as f:
+            f.write(blob_name)
+        return blob_path
+
+    async def _download(self, url: str) -> bytes:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=settings.IMAGE_DOWNLOAD_TIMEOUT, follow_redirects=True)
+        async with self._client.stream("GET", url) as response:
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > self.max_download_bytes:
+                    raise ValueError(f"image larger than {self.max_download_bytes} bytes")
+                chunks.append(chunk)
+        self.downloads += 1
+        return b"".join(chunks)
+
+    async def _build(self, url: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        try:
+            path = await loop.run_in_executor(self._executor, self._lookup, url)
+            if path:
+                self.disk_hits += 1
+                return path
+            data = await self._download(url)
+            optimized = await loop.run_in_executor(self._executor, optimize_image, data, self.max_size, self.quality)
+            path = await loop.run_in_executor(self._executor, self._store, url, optimized)
+            self.processed += 1
+            return path
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Image pipeline failed for {url}: {e}")
+            return None
+
+    async def get(self, url: str) -> Optional[str]:
+        future = self._inflight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(self._build(url))
+            self._inflight[url] = future
+            future.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(future)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "downloads": self.downloads,
+            "processed": self.processed,
+            "disk_hits": self.disk_hits,
+            "failures": self.failures,
+            "inflight": len(self._inflight),
+        }
+
+
+image_pipeline = ImagePipeline(
+    cache_dir=settings.IMAGE_CACHE_DIR,
+    max_size=settings.IMAGE_MAX_SIZE,
+    quality=settings.IMAGE_QUALITY,
+    workers=settings.IMAGE_WORKERS,
+    max_download_bytes=settings.IMAGE_MAX_DOWNLOAD_BYTES,
+)
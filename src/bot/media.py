@@ -0,0 +1,42 @@
+from typing import Optional
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, InlineKeyboardMarkup, Message
+from src.bot.images import image_pipeline
+from src.config import settings
+from src.database import db
+from src.logger import logger
+
+
+def is_file_id(source: str) -> bool:
+    return not source.startswith(("http://", "https://"))
+
+
+def is_rejected_file_id(error: TelegramBadRequest) -> bool:
+    text = error.message.lower()
+    return "file identifier" in text or "file_reference" in text
+
+
+async def send_cached_photo(message: Message, source: str, caption: str, reply_markup: Optional[InlineKeyboardMarkup] = None, parse_mode: str = "Markdown") -> Message:
+    if is_file_id(source):
+        return await message.answer_photo(photo=source, caption=caption, reply_markup=reply_markup, parse_mode=parse_mode)
+
+    file_id = await db.get_media_file_id(source)
+    if file_id:
+        try:
+            return await message.answer_photo(photo=file_id, caption=caption, reply_markup=reply_markup, parse_mode=parse_mode)
+        except TelegramBadRequest as e:
+            if not is_rejected_file_id(e):
+                raise
+            logger.warning(f"Cached file_id for {source} rejected, re-uploading: {e}")
+            await db.forget_media_file_id(source)
+
+    photo = source
+    if settings.IMAGE_PIPELINE:
+        path = await image_pipeline.get(source)
+        if path:
+            photo = FSInputFile(path)
+
+    sent = await message.answer_photo(photo=photo, caption=caption, reply_markup=reply_markup, parse_mode=parse_mode)
+    if sent.photo:
+        await db.set_media_file_id(source, sent.photo[-1].file_id)
+    return sent
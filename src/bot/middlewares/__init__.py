@@ -0,0 +1,23 @@
+from aiogram import Dispatcher
+
+from src.bot.middlewares.ordering import OrderedUpdatesMiddleware
+from src.bot.middlewares.throttling import ThrottlingMiddleware, parse_rate_rules
+from src.bot.middlewares.user import UserMiddleware
+from src.config import settings
+
+
+def setup_middlewares(dp: Dispatcher) -> None:
+    dp.update.outer_middleware(OrderedUpdatesMiddleware(max_active=settings.UPDATE_MAX_ACTIVE_USERS))
+    throttling_middleware = ThrottlingMiddleware(
+        rate=settings.THROTTLE_USER_RATE,
+        burst=settings.THROTTLE_USER_BURST,
+        callback_rules=parse_rate_rules(settings.THROTTLE_CALLBACK_RULES)
+    )
+    dp["throttling"] = throttling_middleware
+    dp.message.outer_middleware(throttling_middleware)
+    dp.callback_query.outer_middleware(throttling_middleware)
+    dp.inline_query.outer_middleware(throttling_middleware)
+
+    user_middleware = UserMiddleware()
+    dp.message.outer_middleware(user_middleware)
+    dp.callback_query.outer_middleware(user_middleware)
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+
+class _Lane:
+    __slots__ = ("lock", "waiters")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.waiters = 0
+
+
+class OrderedUpdatesMiddleware(BaseMiddleware):
+    def __init__(self, max_active: int):
+        self.max_active = max_active
+        self._active = asyncio.Semaphore(max_active)
+        self._lanes: Dict[int, _Lane] = {}
+        self.running = 0
+        self.peak_running = 0
+        self.peak_lanes = 0
+        self.released = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        if from_user is None or getattr(event, "inline_query", None) is not None:
+            return await handler(event, data)
+
+        lane = self._lanes.get(from_user.id)
+        if lane is None:
+            lane = self._lanes[from_user.id] = _Lane()
+            self.peak_lanes = max(self.peak_lanes, len(self._lanes))
+
+        lane.waiters += 1
+        try:
+            async with lane.lock:
+                async with self._active:
+                    self.running += 1
+                    self.peak_running = max(self.peak_running, self.running)
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        self.running -= 1
+        finally:
+            lane.waiters -= 1
+            if lane.waiters == 0 and self._lanes.get(from_user.id) is lane:
+                del self._lanes[from_user.id]
+                self.released += 1
+
+    def stats(self) -> dict:
+        return {
+            "lanes": len(self._lanes),
+            "queued": sum(lane.waiters for lane in self._lanes.values()) - self.running,
+            "running": self.running,
+            "max_active": self.max_active,
+            "peak_running": self.peak_running,
+            "peak_lanes": self.peak_lanes,
+            "released": self.released,
+        }
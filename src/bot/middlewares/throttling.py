@@ -0,0 +1,125 @@
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+
+def parse_rate_rules(spec: str) -> Dict[str, Tuple[float, float]]:
+    rules = {}
+    for item in spec.split(","):
+        if ":" not in item:
+            continue
+        prefix, rate = item.rsplit(":", 1)
+        per_second, _, burst = rate.partition("/")
+        try:
+            rules[prefix.strip()] = (float(per_second), float(burst or per_second))
+        except ValueError:
+            continue
+    return rules
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, now: float) -> float:
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def consume(self, now: float) -> bool:
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    def __init__(self, rate: float, burst: float, callback_rules: Dict[str, Tuple[float, float]], sweep_every: int = 1000):
+        self.rate = rate
+        self.burst = burst
+        self.callback_rules = dict(sorted(callback_rules.items(), key=lambda item: len(item[0]), reverse=True))
+        self.sweep_every = sweep_every
+        self._buckets: Dict[tuple, TokenBucket] = {}
+        self._calls = 0
+        self.allowed = 0
+        self.throttled = Counter()
+
+    def _bucket(self, key: tuple, rate: float, capacity: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+        return bucket
+
+    def _match_prefix(self, data: Optional[str]) -> Optional[str]:
+        if not data:
+            return None
+        for prefix in self.callback_rules:
+            if data.startswith(prefix):
+                return prefix
+        return None
+
+    def _sweep(self, now: float) -> None:
+        full = []
+        for key, bucket in self._buckets.items():
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                full.append(key)
+        for key in full:
+            del self._buckets[key]
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        if from_user is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        self._calls += 1
+        if self._calls % self.sweep_every == 0:
+            self._sweep(now)
+
+        reason = None
+        prefix = self._match_prefix(event.data) if isinstance(event, CallbackQuery) else None
+        if prefix is not None:
+            rate, capacity = self.callback_rules[prefix]
+            if not self._bucket((from_user.id, prefix), rate, capacity).consume(now):
+                reason = prefix
+        if reason is None and not self._bucket((from_user.id,), self.rate, self.burst).consume(now):
+            reason = "user"
+
+        if reason is None:
+            self.allowed += 1
+            return await handler(event, data)
+
+        self.throttled[reason] += 1
+        if isinstance(event, CallbackQuery):
+            try:
+                await event.answer()
+            except Exception:
+                pass
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "throttled": sum(self.throttled.values()),
+            "by_reason": dict(self.throttled),
+            "buckets": len(self._buckets),
+        }
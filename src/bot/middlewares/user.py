@@ -0,0 +1,23 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+from src.database import db
+
+
+class UserMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get("event_from_user")
+
+        if from_user and not from_user.is_bot:
+            if isinstance(event, Message) and event.text and event.text.startswith("/start"):
+                # /start registers new users itself so it can attach the referrer
+                data["user"] = await db.get_cached_user(from_user.id)
+            else:
+                data["user"] = await db.get_or_create_user(from_user.id, from_user.username, from_user.first_name)
+
+        return await handler(event, data)
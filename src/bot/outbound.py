@@ -0,0 +1,249 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, AnswerInlineQuery, TelegramMethod
+from src.bot.middlewares.throttling import TokenBucket
+from src.config import settings
+from src.logger import logger
+
+ANSWER = 0
+MESSAGE = 1
+
+ChatId = Union[int, str, None]
+
+
+class _Job:
+    __slots__ = ("chat_id", "call", "future", "attempts", "queued_at")
+
+    def __init__(self, chat_id: ChatId, call: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        self.chat_id = chat_id
+        self.call = call
+        self.future = future
+        self.attempts = 0
+        self.queued_at = time.monotonic()
+
+
+class OutboundScheduler:
+    def __init__(
+        self,
+        global_rate: float,
+        chat_rate: float,
+        chat_burst: float,
+        group_rate: float,
+        max_retries: int,
+        drain_timeout: float
+    ):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.drain_timeout = drain_timeout
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[ChatId, TokenBucket] = {}
+        self._paused_until: Dict[ChatId, float] = {}
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+        self._dispatched = 0
+        self.submitted = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.peak_queued = 0
+        self.max_wait = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _chat_bucket(self, chat_id: ChatId) -> Optional[TokenBucket]:
+        if chat_id is None:
+            return None
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            rate = self.group_rate if is_group else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    def _chat_delay(self, chat_id: ChatId, now: float) -> float:
+        delay = max(self._paused_until.get(chat_id, 0.0) - now, 0.0)
+        bucket = self._chat_bucket(chat_id)
+        if bucket is not None:
+            delay = max(delay, bucket.delay(now))
+        return delay
+
+    def _push(self, priority: int, seq: int, job: _Job) -> None:
+        heapq.heappush(self._queue, (priority, seq, job))
+        self.peak_queued = max(self.peak_queued, len(self._queue))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def submit(self, chat_id: ChatId, priority: int, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self.submitted += 1
+        self._push(priority, next(self._seq), _Job(chat_id, call, future))
+        return await future
+
+    def _next_ready(self, now: float) -> tuple:
+        global_delay = self._global.delay(now)
+        if global_delay > 0:
+            return None, global_delay
+
+        skipped = []
+        entry, wait = None, None
+        while self._queue:
+            candidate = heapq.heappop(self._queue)
+            delay = self._chat_delay(candidate[2].chat_id, now)
+            if delay <= 0:
+                entry = candidate
+                break
+            skipped.append(candidate)
+            wait = delay if wait is None else min(wait, delay)
+        for candidate in skipped:
+            heapq.heappush(self._queue, candidate)
+        return entry, wait
+
+    def _sweep(self, now: float) -> None:
+        self._chats = {
+            chat_id: bucket for chat_id, bucket in self._chats.items()
+            if bucket.delay(now) > 0 or bucket.tokens < bucket.capacity
+        }
+        self._paused_until = {chat_id: until for chat_id, until in self._paused_until.items() if until > now}
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            entry, wait = self._next_ready(now) if self._queue else (None, None)
+            if entry is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            priority, seq, job = entry
+            self._global.consume(now)
+            bucket = self._chat_bucket(job.chat_id)
+            if bucket is not None:
+                bucket.consume(now)
+            self.max_wait = max(self.max_wait, now - job.queued_at)
+
+            task = asyncio.create_task(self._execute(priority, seq, job))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+            self._dispatched += 1
+            if self._dispatched % 1000 == 0:
+                self._sweep(now)
+
+    async def _execute(self, priority: int, seq: int, job: _Job) -> None:
+        if job.future.done():
+            return
+        try:
+            result = await job.call()
+        except TelegramRetryAfter as e:
+            job.attempts += 1
+            self.retried += 1
+            self._paused_until[job.chat_id] = time.monotonic() + e.retry_after
+            logger.warning(f"Telegram flood control for chat {job.chat_id}, retrying in {e.retry_after}s")
+            if job.attempts > self.max_retries:
+                self.failed += 1
+                job.future.set_exception(e)
+            else:
+                self._push(priority, seq, job)
+            return
+        except Exception as e:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        self.sent += 1
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def start(self) -> None:
+        if not self.running:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        deadline = time.monotonic() + self.drain_timeout
+        while (self._queue or self._inflight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._inflight:
+            await asyncio.wait(list(self._inflight))
+
+        if self._queue:
+            logger.warning(f"Outbound scheduler stopped with {len(self._queue)} unsent requests")
+        while self._queue:
+            _, _, job = heapq.heappop(self._queue)
+            if not job.future.done():
+                self.failed += 1
+                job.future.set_exception(RuntimeError("Outbound scheduler stopped"))
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "in_flight": len(self._inflight),
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "peak_queued": self.peak_queued,
+            "max_wait": round(self.max_wait, 3),
+            "chats": len(self._chats),
+        }
+
+
+class OutboundMiddleware(BaseRequestMiddleware):
+    def __init__(self, scheduler: OutboundScheduler):
+        self.scheduler = scheduler
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod):
+        if not self.scheduler.running:
+            return await make_request(bot, method)
+
+        if isinstance(method, (AnswerCallbackQuery, AnswerInlineQuery)):
+            return await self.scheduler.submit(None, ANSWER, lambda: make_request(bot, method))
+
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None and getattr(method, "inline_message_id", None) is None:
+            return await make_request(bot, method)
+
+        return await self.scheduler.submit(chat_id, MESSAGE, lambda: make_request(bot, method))
+
+
+outbound = OutboundScheduler(
+    global_rate=settings.OUTBOUND_GLOBAL_RATE / max(settings.WORKERS, 1),
+    chat_rate=settings.OUTBOUND_CHAT_RATE,
+    chat_burst=settings.OUTBOUND_CHAT_BURST,
+    group_rate=settings.OUTBOUND_GROUP_RATE,
+    max_retries=settings.OUTBOUND_MAX_RETRIES,
+    drain_timeout=settings.OUTBOUND_DRAIN_TIMEOUT,
+)
+
+
+def create_bot() -> Bot:
+    bot = Bot(token=settings.BOT_TOKEN)
+    bot.session.middleware(OutboundMiddleware(outbound))
+    return bot
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from src.config import settings
+from src.logger import logger
+
+
+def storage_key_id(key: StorageKey) -> str:
+    parts = [str(key.bot_id), str(key.chat_id), str(key.user_id)]
+    if key.thread_id:
+        parts.append(str(key.thread_id))
+    parts.append(key.destiny)
+    return ":".join(parts)
+
+
+class SQLiteStorage(BaseStorage):
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl or None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._writes = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fsm_storage ("
+                "key TEXT PRIMARY KEY, state TEXT, data TEXT, expires_at REAL)"
+            )
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl else None
+
+    def _read(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, data FROM fsm_storage WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        return row
+
+    def _write(self, key: str, column: str, value: Optional[str]) -> None:
+        other = "data" if column == "state" else "state"
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO fsm_storage (key, {column}, expires_at) VALUES (?, ?, ?) "
+                f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}, "
+                f"{other} = CASE WHEN fsm_storage.expires_at <= ? THEN NULL ELSE fsm_storage.{other} END, "
+                f"expires_at = excluded.expires_at",
+                (key, value, self._expires_at(), now)
+            )
+            self._conn.execute(
+                "DELETE FROM fsm_storage WHERE key = ? AND state IS NULL AND (data IS NULL OR data = '{}')",
+                (key,)
+            )
+            self._writes += 1
+            if self.ttl and self._writes % 1000 == 0:
+                self._conn.execute("DELETE FROM fsm_storage WHERE expires_at <= ?", (now,))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await asyncio.to_thread(self._write, storage_key_id(key), "state", value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await asyncio.to_thread(self._read, storage_key_id(key))
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        value = json.dumps(data) if data else None
+        await asyncio.to_thread(self._write, storage_key_id(key), "data", value)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await asyncio.to_thread(self._read, storage_key_id(key))
+        return json.loads(row[1]) if row and row[1] else {}
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_storage() -> BaseStorage:
+    backend = settings.FSM_STORAGE
+    ttl = settings.FSM_STATE_TTL or None
+
+    if backend == "sqlite":
+        return SQLiteStorage(settings.FSM_SQLITE_PATH, ttl=ttl)
+
+    if backend == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError:
+            logger.warning("FSM_STORAGE=redis but the 'redis' package is missing, falling back to memory storage")
+            return MemoryStorage()
+        return RedisStorage.from_url(settings.FSM_REDIS_URL, state_ttl=ttl, data_ttl=ttl)
+
+    return MemoryStorage()
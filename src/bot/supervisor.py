@@ -0,0 +1,230 @@
+import asyncio
+import multiprocessing
+import queue
+import secrets
+import signal
+from typing import List, Optional
+
+from aiohttp import web
+from aiogram import Bot
+from src.bot.app import create_dispatcher, register_webhook, seed, start_services, stop_services, webhook_url
+from src.bot.outbound import create_bot
+from src.config import settings
+from src.database import db
+from src.logger import logger
+
+
+def update_routing_key(raw: dict) -> int:
+    for field, value in raw.items():
+        if field == "update_id" or not isinstance(value, dict):
+            continue
+        for holder in ("from", "user"):
+            if isinstance(value.get(holder), dict) and value[holder].get("id"):
+                return int(value[holder]["id"])
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if isinstance(chat, dict) and chat.get("id"):
+            return int(chat["id"])
+    return 0
+
+
+async def _listen_invalidations(index: int, control: multiprocessing.Queue) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            message = await loop.run_in_executor(None, control.get, True, 1)
+        except queue.Empty:
+            continue
+        if message is None:
+            break
+        try:
+            await db.apply_invalidation(*message)
+        except Exception as e:
+            logger.error(f"Worker {index} failed to apply invalidation {message}: {e}")
+
+
+async def _worker_loop(
+    index: int,
+    updates: multiprocessing.Queue,
+    control: multiprocessing.Queue,
+    events: multiprocessing.Queue
+) -> None:
+    db.publisher = lambda message: events.put_nowait((index, message))
+    bot = create_bot()
+    dp = create_dispatcher()
+    await start_services()
+    await dp.emit_startup(bot=bot)
+
+    loop = asyncio.get_running_loop()
+    listener = asyncio.create_task(_listen_invalidations(index, control))
+    tasks = set()
+
+    async def process(raw: dict) -> None:
+        try:
+            await dp.feed_raw_update(bot, raw)
+        except Exception as e:
+            logger.error(f"Worker {index} failed to process update {raw.get('update_id')}: {e}")
+
+    logger.info(f"Worker {index} started")
+    try:
+        while True:
+            raw = await loop.run_in_executor(None, updates.get)
+            if raw is None:
+                break
+            task = asyncio.create_task(process(raw))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(list(tasks))
+    finally:
+        db.publisher = None
+        listener.cancel()
+        await dp.emit_shutdown(bot=bot)
+        await stop_services(bot, dp)
+        logger.info(f"Worker {index} stopped")
+
+
+def worker_main(
+    index: int,
+    updates: multiprocessing.Queue,
+    control: multiprocessing.Queue,
+    events: multiprocessing.Queue
+) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_worker_loop(index, updates, control, events))
+
+
+class Supervisor:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._ctx = multiprocessing.get_context("spawn")
+        self.queues: List[multiprocessing.Queue] = [
+            self._ctx.Queue(maxsize=settings.WORKER_QUEUE_SIZE) for _ in range(workers)
+        ]
+        self.controls: List[multiprocessing.Queue] = [self._ctx.Queue() for _ in range(workers)]
+        self.events = self._ctx.Queue()
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self.routed = [0] * workers
+        self.invalidations = 0
+
+    def _spawn(self, index: int) -> None:
+        process = self._ctx.Process(
+            target=worker_main,
+            args=(index, self.queues[index], self.controls[index], self.events),
+            name=f"bot-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            self._spawn(index)
+
+    async def watch(self) -> None:
+        while True:
+            await asyncio.sleep(1)
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive():
+                    logger.warning(f"Worker {index} exited with code {process.exitcode}, restarting")
+                    self._spawn(index)
+
+    async def fanout(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, self.events.get)
+            if item is None:
+                break
+            origin, message = item
+            self.invalidations += 1
+            for index, control in enumerate(self.controls):
+                if index != origin:
+                    control.put_nowait(message)
+
+    async def route(self, raw: dict) -> None:
+        index = update_routing_key(raw) % self.workers
+        self.routed[index] += 1
+        try:
+            self.queues[index].put_nowait(raw)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, self.queues[index].put, raw)
+
+    def stop(self) -> None:
+        self.events.put(None)
+        for control in self.controls:
+            control.put(None)
+        for updates in self.queues:
+            try:
+                updates.put(None, timeout=1)
+            except queue.Full:
+                pass
+        for process in self.processes:
+            if process is not None:
+                process.join(timeout=settings.WORKER_SHUTDOWN_TIMEOUT)
+                if process.is_alive():
+                    process.terminate()
+
+
+async def poll_updates(bot: Bot, supervisor: Supervisor, allowed_updates: List[str]) -> None:
+    await bot.delete_webhook(drop_pending_updates=True)
+    offset = None
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=allowed_updates)
+        except Exception as e:
+            logger.error(f"Polling failed: {e}")
+            await asyncio.sleep(1)
+            continue
+        for update in updates:
+            offset = update.update_id + 1
+            await supervisor.route(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+
+
+async def serve_webhook(bot: Bot, supervisor: Supervisor, allowed_updates: List[str]) -> None:
+    async def handle(request: web.Request) -> web.Response:
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not secrets.compare_digest(token.encode(), settings.WEBHOOK_SECRET.encode()):
+            return web.Response(status=401)
+        await supervisor.route(await request.json())
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(settings.WEBHOOK_PATH, handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT).start()
+        await register_webhook(bot, allowed_updates)
+        print(f"Webhook listening on {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_supervisor() -> None:
+    if settings.BOT_MODE == "webhook":
+        webhook_url()
+
+    await seed()
+
+    bot = Bot(token=settings.BOT_TOKEN)
+    dp = create_dispatcher()
+    allowed_updates = dp.resolve_used_update_types()
+    await dp.storage.close()
+
+    supervisor = Supervisor(settings.WORKERS)
+    supervisor.start()
+    watcher = asyncio.create_task(supervisor.watch())
+    fanout = asyncio.create_task(supervisor.fanout())
+
+    try:
+        print(f"Bot is running with {settings.WORKERS} workers ({settings.BOT_MODE})...")
+        if settings.BOT_MODE == "webhook":
+            await serve_webhook(bot, supervisor, allowed_updates)
+        else:
+            await poll_updates(bot, supervisor, allowed_updates)
+    finally:
+        watcher.cancel()
+        await bot.session.close()
+        await asyncio.get_running_loop().run_in_executor(None, supervisor.stop)
+        await fanout
+        await db.close()
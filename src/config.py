@@ -9,9 +9,79 @@ class Settings:
     ADMIN_IDS_STR = os.getenv("ADMIN_IDS", "")
     ADMIN_IDS = [int(id.strip()) for id in ADMIN_IDS_STR.split(",") if id.strip()]
 
+    BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "1000"))
+    WORKER_SHUTDOWN_TIMEOUT = float(os.getenv("WORKER_SHUTDOWN_TIMEOUT", "10"))
+
+    UPDATE_MAX_ACTIVE_USERS = int(os.getenv("UPDATE_MAX_ACTIVE_USERS", "100"))
+
+    THROTTLE_USER_RATE = float(os.getenv("THROTTLE_USER_RATE", "3"))
+    THROTTLE_USER_BURST = float(os.getenv("THROTTLE_USER_BURST", "10"))
+    THROTTLE_CALLBACK_RULES = os.getenv(
+        "THROTTLE_CALLBACK_RULES",
+        "cart_inc_:2/4,cart_dec_:2/4,admin_dashboard:0.2/2,admin_recount_stats:0.05/1,admin_tickets:0.2/2,spin_now:0.5/1,pay_:0.5/2"
+    )
+
+    OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "30"))
+    OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+    OUTBOUND_CHAT_BURST = float(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+    OUTBOUND_GROUP_RATE = float(os.getenv("OUTBOUND_GROUP_RATE", str(20 / 60)))
+    OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))
+    OUTBOUND_DRAIN_TIMEOUT = float(os.getenv("OUTBOUND_DRAIN_TIMEOUT", "10"))
+
+    FSM_STORAGE = os.getenv("FSM_STORAGE", "memory").lower()
+    FSM_SQLITE_PATH = os.getenv("FSM_SQLITE_PATH", "data/fsm.sqlite3")
+    FSM_REDIS_URL = os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0")
+    FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", "86400"))
+
     SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL", "")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY") or os.getenv("VITE_SUPABASE_ANON_KEY", "")
 
+    SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+    SUPABASE_KEEPALIVE_CONNECTIONS = int(os.getenv("SUPABASE_KEEPALIVE_CONNECTIONS", "10"))
+    SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+    SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+    SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+    SUPABASE_MAX_INFLIGHT = int(os.getenv("SUPABASE_MAX_INFLIGHT", "32"))
+    SUPABASE_QUEUE_TIMEOUT = float(os.getenv("SUPABASE_QUEUE_TIMEOUT", "15"))
+
+    CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+    CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "10"))
+    STOCK_CACHE_TTL = float(os.getenv("STOCK_CACHE_TTL", "5"))
+
+    LOCAL_SEARCH_INDEX = os.getenv("LOCAL_SEARCH_INDEX", "false").lower() == "true"
+    SEARCH_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", "0.4"))
+
+    MEDIA_CACHE_TTL = float(os.getenv("MEDIA_CACHE_TTL", "86400"))
+    MEDIA_CACHE_SIZE = int(os.getenv("MEDIA_CACHE_SIZE", "5000"))
+
+    IMAGE_PIPELINE = os.getenv("IMAGE_PIPELINE", "true").lower() == "true"
+    IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "data/image_cache")
+    IMAGE_MAX_SIZE = int(os.getenv("IMAGE_MAX_SIZE", "1280"))
+    IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+    IMAGE_MAX_DOWNLOAD_BYTES = int(os.getenv("IMAGE_MAX_DOWNLOAD_BYTES", str(10 * 1024 * 1024)))
+    IMAGE_DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "15"))
+
+    INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "300"))
+    INLINE_PAGE_SIZE = int(os.getenv("INLINE_PAGE_SIZE", "20"))
+    INLINE_MAX_RESULTS = int(os.getenv("INLINE_MAX_RESULTS", "100"))
+
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+    SETTINGS_CACHE_TTL = float(os.getenv("SETTINGS_CACHE_TTL", "600"))
+
+    LEDGER_COMPACT_INTERVAL = float(os.getenv("LEDGER_COMPACT_INTERVAL", "300"))
+    LEDGER_SETTLE_SECONDS = int(os.getenv("LEDGER_SETTLE_SECONDS", "60"))
+
     REFERRAL_COMMISSION = int(os.getenv("REFERRAL_COMMISSION", "10"))
 
     TIER_THRESHOLDS = {
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Optional
+
+from src.logger import logger
+
+
+class LedgerCompactor:
+    def __init__(self, database, interval: float):
+        self.database = database
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.compacted = 0
+
+    async def compact(self) -> int:
+        compacted = await self.database.compact_balance_ledger()
+        self.runs += 1
+        self.compacted += compacted
+        if compacted:
+            logger.info(f"Ledger compaction rolled {compacted} balance snapshots forward")
+        return compacted
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.error(f"Ledger compaction error: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "compacted": self.compacted}
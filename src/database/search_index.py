@@ -0,0 +1,115 @@
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+FIELD_WEIGHTS = {"name": 1.0, "category": 0.6, "description": 0.4}
+
+DISPLAY_FIELDS = ("id", "category_id", "name", "description", "price", "product_type", "image_url")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> list:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def text_trigrams(text: Optional[str]) -> set:
+    grams = set()
+    for token in tokenize(text):
+        grams |= trigrams(token)
+    return grams
+
+
+class CatalogSearchIndex:
+    def __init__(self, threshold: float = 0.4):
+        self.threshold = threshold
+        self.ready = False
+        self._docs: Dict[int, dict] = {}
+        self._categories: Dict[int, str] = {}
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._grams: Dict[int, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def build(self, categories: Iterable[dict], products: Iterable[dict]) -> None:
+        self._docs.clear()
+        self._postings.clear()
+        self._grams.clear()
+        self._categories = {c["id"]: c.get("name") or "" for c in categories if c.get("is_active", True)}
+        for product in products:
+            self.upsert_product(product)
+        self.ready = True
+
+    def upsert_product(self, product: dict) -> None:
+        product_id = product["id"]
+        self.remove_product(product_id)
+        if not product.get("is_active", True):
+            return
+
+        weights: Dict[str, float] = {}
+        fields = {
+            "name": product.get("name"),
+            "category": self._categories.get(product.get("category_id"), ""),
+            "description": product.get("description"),
+        }
+        for field, text in fields.items():
+            for gram in text_trigrams(text):
+                weights[gram] = max(weights.get(gram, 0.0), FIELD_WEIGHTS[field])
+
+        for gram, weight in weights.items():
+            self._postings[gram][product_id] = weight
+        self._grams[product_id] = set(weights)
+        self._docs[product_id] = {field: product[field] for field in DISPLAY_FIELDS if field in product}
+
+    def remove_product(self, product_id: int) -> None:
+        for gram in self._grams.pop(product_id, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.pop(product_id, None)
+                if not posting:
+                    del self._postings[gram]
+        self._docs.pop(product_id, None)
+
+    def upsert_category(self, category: dict) -> None:
+        category_id = category["id"]
+        if category.get("is_active", True):
+            self._categories[category_id] = category.get("name") or ""
+        else:
+            self._categories.pop(category_id, None)
+        for doc in list(self._docs.values()):
+            if doc.get("category_id") == category_id:
+                self.upsert_product(doc)
+
+    def get(self, product_id: int) -> Optional[dict]:
+        doc = self._docs.get(product_id)
+        return dict(doc) if doc is not None else None
+
+    def remove_category(self, category_id: int) -> None:
+        self.upsert_category({"id": category_id, "is_active": False})
+
+    def search(self, query: str, limit: int = 10) -> list:
+        query_grams = text_trigrams(query)
+        if not query_grams:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        for gram in query_grams:
+            for product_id, weight in self._postings.get(gram, {}).items():
+                scores[product_id] += weight
+
+        needle = query.strip().lower()
+        ranked = []
+        for product_id, score in scores.items():
+            similarity = score / len(query_grams)
+            in_name = needle in (self._docs[product_id].get("name") or "").lower()
+            if in_name or similarity >= self.threshold:
+                ranked.append((not in_name, -similarity, product_id))
+
+        ranked.sort()
+        return [product_id for _, _, product_id in ranked[:limit]]
@@ -102,13 +102,13 @@ def generate_stock_item(product_type: str, product_name: str) -> str:
         return generate_key()
 
 
-def seed_database():
-    existing_categories = db.get_categories()
+async def seed_database():
+    existing_categories = await db.get_categories()
     if existing_categories:
         return False
 
     for cat_name, cat_data in DEMO_DATA.items():
-        category = db.create_category(
+        category = await db.create_category(
             name=cat_name,
             emoji=cat_data["emoji"],
             description=f"{cat_name} - Digital products"
@@ -120,7 +120,7 @@ def seed_database():
         cat_id = category["id"]
 
         for prod in cat_data["products"]:
-            product = db.create_product(
+            product = await db.create_product(
                 category_id=cat_id,
                 name=prod["name"],
                 price=prod["price"],
@@ -137,10 +137,10 @@ def seed_database():
                 stock_items.append(item)
 
             if stock_items:
-                db.add_stock(product["id"], stock_items)
+                await db.add_stock(product["id"], stock_items)
 
-    db.create_coupon("WELCOME10", discount_percent=10, max_uses=100)
-    db.create_coupon("SAVE20", discount_percent=20, max_uses=50)
-    db.create_coupon("VIP50", discount_percent=50, max_uses=10)
+    await db.create_coupon("WELCOME10", discount_percent=10, max_uses=100)
+    await db.create_coupon("SAVE20", discount_percent=20, max_uses=50)
+    await db.create_coupon("VIP50", discount_percent=50, max_uses=10)
 
     return True
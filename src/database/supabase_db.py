@@ -1,13 +1,23 @@
 import random
 import string
 from datetime import datetime
-from typing import Optional
-from supabase import create_client, Client
+from typing import Callable, Optional
+from postgrest.exceptions import APIError
 from src.config import settings
+from src.database.cache import TTLCache
+from src.database.ledger import LedgerCompactor
+from src.database.search_index import CatalogSearchIndex
+from src.database.transport import PooledPostgrestClient
 
 
-def get_client() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+def get_client() -> PooledPostgrestClient:
+    return PooledPostgrestClient(
+        f"{settings.SUPABASE_URL}/rest/v1",
+        headers={
+            "apikey": settings.SUPABASE_KEY,
+            "Authorization": f"Bearer {settings.SUPABASE_KEY}",
+        },
+    )
 
 
 def generate_referral_code() -> str:
@@ -17,15 +27,75 @@ def generate_referral_code() -> str:
 class Database:
     def __init__(self):
         self.client = get_client()
-
-    def get_user(self, user_id: int) -> Optional[dict]:
-        try:
-            result = self.client.table("users").select("*").eq("id", user_id).maybe_single().execute()
-            return result.data if result else None
+        self.catalog_cache = TTLCache(ttl=settings.CATALOG_CACHE_TTL)
+        self.stock_cache = TTLCache(ttl=settings.STOCK_CACHE_TTL)
+        self.user_cache = TTLCache(ttl=settings.USER_CACHE_TTL, maxsize=settings.USER_CACHE_SIZE)
+        self.settings_cache = TTLCache(ttl=settings.SETTINGS_CACHE_TTL, maxsize=1)
+        self.media_cache = TTLCache(ttl=settings.MEDIA_CACHE_TTL, maxsize=settings.MEDIA_CACHE_SIZE)
+        self.search_index = CatalogSearchIndex(threshold=settings.SEARCH_SIMILARITY_THRESHOLD)
+        self.publisher: Optional[Callable[[tuple], None]] = None
+        self.ledger = LedgerCompactor(self, interval=settings.LEDGER_COMPACT_INTERVAL)
+
+    async def close(self) -> None:
+        await self.ledger.stop()
+        await self.client.aclose()
+
+    def get_transport_stats(self) -> dict:
+        return self.client.session.stats()
+
+    def publish(self, *message) -> None:
+        if self.publisher is not None:
+            try:
+                self.publisher(message)
+            except Exception:
+                pass
+
+    async def apply_invalidation(self, kind: str, *args) -> None:
+        if kind == "user":
+            self.user_cache.invalidate(args[0])
+        elif kind == "stock":
+            self.stock_cache.invalidate(args[0])
+        elif kind == "settings":
+            self.settings_cache.clear()
+        elif kind == "media":
+            self.media_cache.invalidate(args[0])
+        elif kind == "category":
+            self._drop_category(args[0])
+            if self.search_index.ready:
+                category = await self.get_category(args[0])
+                if category:
+                    self.search_index.upsert_category(category)
+        elif kind == "product":
+            self._drop_product(*args)
+            if self.search_index.ready:
+                product = await self.get_product(args[0])
+                if product:
+                    self.search_index.upsert_product(product)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.user_cache.invalidate(user_id)
+        self.publish("user", user_id)
+
+    async def get_user(self, user_id: int) -> Optional[dict]:
+        try:
+            result = await self.client.table("users").select("*, live_balance, live_referral_earnings").eq("id", user_id).maybe_single().execute()
+            user = result.data if result else None
+            if user and "live_balance" in user:
+                user["balance"] = user.pop("live_balance")
+                user["referral_earnings"] = user.pop("live_referral_earnings")
+            if user:
+                self.user_cache.set(user_id, user)
+            return user
         except Exception:
             return None
 
-    def create_user(self, user_id: int, username: str = None, first_name: str = None, referred_by: int = None) -> dict:
+    async def get_cached_user(self, user_id: int) -> Optional[dict]:
+        user = self.user_cache.get(user_id)
+        if user is not None:
+            return user
+        return await self.get_user(user_id)
+
+    async def create_user(self, user_id: int, username: str = None, first_name: str = None, referred_by: int = None) -> dict:
         referral_code = generate_referral_code()
         data = {
             "id": user_id,
@@ -39,68 +109,69 @@ class Database:
             "referral_earnings": 0.0
         }
         try:
-            result = self.client.table("users").insert(data).execute()
+            result = await self.client.table("users").insert(data).execute()
+            self.invalidate_user(user_id)
             return result.data[0] if result and result.data else data
         except Exception:
             return data
 
-    def get_or_create_user(self, user_id: int, username: str = None, first_name: str = None) -> dict:
-        user = self.get_user(user_id)
+    async def get_or_create_user(self, user_id: int, username: str = None, first_name: str = None) -> dict:
+        user = await self.get_cached_user(user_id)
         if not user:
-            user = self.create_user(user_id, username, first_name)
+            user = await self.create_user(user_id, username, first_name)
         return user
 
-    def update_user(self, user_id: int, data: dict) -> Optional[dict]:
+    async def update_user(self, user_id: int, data: dict) -> Optional[dict]:
         try:
-            result = self.client.table("users").update(data).eq("id", user_id).execute()
+            result = await self.client.table("users").update(data).eq("id", user_id).execute()
+            self.invalidate_user(user_id)
             return result.data[0] if result and result.data else None
         except Exception:
+            self.invalidate_user(user_id)
             return None
 
-    def get_user_by_referral_code(self, code: str) -> Optional[dict]:
+    async def get_user_by_referral_code(self, code: str) -> Optional[dict]:
         try:
-            result = self.client.table("users").select("*").eq("referral_code", code).maybe_single().execute()
+            result = await self.client.table("users").select("*").eq("referral_code", code).maybe_single().execute()
             return result.data if result else None
         except Exception:
             return None
 
-    def add_balance(self, user_id: int, amount: float, description: str = None, tx_type: str = "topup") -> float:
+    async def apply_balance_delta(self, user_id: int, amount: float, tx_type: str, description: str = None, reference_id: str = None) -> Optional[float]:
         try:
-            user = self.get_user(user_id)
-            if not user:
-                return 0.0
-            new_balance = float(user["balance"]) + amount
-            self.update_user(user_id, {"balance": new_balance})
-            self.client.table("transactions").insert({
-                "user_id": user_id,
-                "type": tx_type,
-                "amount": amount,
-                "description": description
+            result = await self.client.rpc("apply_balance_delta", {
+                "p_user_id": user_id,
+                "p_amount": amount,
+                "p_type": tx_type,
+                "p_description": description,
+                "p_reference_id": reference_id
             }).execute()
-            return new_balance
+            self.invalidate_user(user_id)
+            return float(result.data[0]["new_balance"]) if result and result.data else None
         except Exception:
-            return 0.0
+            self.invalidate_user(user_id)
+            return None
 
-    def deduct_balance(self, user_id: int, amount: float, description: str = None) -> float:
+    async def compact_balance_ledger(self) -> int:
         try:
-            user = self.get_user(user_id)
-            if not user:
-                return 0.0
-            new_balance = float(user["balance"]) - amount
-            self.update_user(user_id, {"balance": new_balance})
-            self.client.table("transactions").insert({
-                "user_id": user_id,
-                "type": "purchase",
-                "amount": -amount,
-                "description": description
+            result = await self.client.rpc("compact_balance_ledger", {
+                "p_settle": f"{settings.LEDGER_SETTLE_SECONDS} seconds"
             }).execute()
-            return new_balance
+            return int(result.data[0]["compacted_users"]) if result and result.data else 0
         except Exception:
-            return 0.0
+            return 0
+
+    async def add_balance(self, user_id: int, amount: float, description: str = None, tx_type: str = "topup") -> float:
+        new_balance = await self.apply_balance_delta(user_id, amount, tx_type, description)
+        return new_balance if new_balance is not None else 0.0
 
-    def update_user_tier(self, user_id: int) -> str:
+    async def deduct_balance(self, user_id: int, amount: float, description: str = None) -> float:
+        new_balance = await self.apply_balance_delta(user_id, -amount, "purchase", description)
+        return new_balance if new_balance is not None else 0.0
+
+    async def update_user_tier(self, user_id: int) -> str:
         try:
-            user = self.get_user(user_id)
+            user = await self.get_user(user_id)
             if not user:
                 return "bronze"
             total_spent = float(user["total_spent"])
@@ -110,65 +181,170 @@ class Database:
                     new_tier = tier
                     break
             if new_tier != user["tier"]:
-                self.update_user(user_id, {"tier": new_tier})
+                await self.update_user(user_id, {"tier": new_tier})
             return new_tier
         except Exception:
             return "bronze"
 
-    def get_categories(self) -> list:
+    def _drop_category(self, category_id: int) -> None:
+        self.catalog_cache.invalidate(("categories",))
+        self.catalog_cache.invalidate(("category", category_id))
+
+    def invalidate_category(self, category_id: int) -> None:
+        self._drop_category(category_id)
+        self.publish("category", category_id)
+
+    def invalidate_product(self, product_id: int, category_id: int = None) -> None:
+        category_id = self._drop_product(product_id, category_id)
+        self.publish("product", product_id, category_id)
+
+    def invalidate_stock(self, product_id: int) -> None:
+        self.stock_cache.invalidate(product_id)
+        self.publish("stock", product_id)
+
+    def _drop_product(self, product_id: int, category_id: int = None) -> Optional[int]:
+        cached = self.catalog_cache.get(("product", product_id))
+        self.catalog_cache.invalidate(("product", product_id))
+        if category_id is None and cached:
+            category_id = cached.get("category_id")
+        if category_id is None:
+            self.catalog_cache.invalidate_prefix(("products",))
+            self.catalog_cache.invalidate_prefix(("products_page",))
+            return None
+        for scope in (None, category_id):
+            self.catalog_cache.invalidate(("products", scope))
+            self.catalog_cache.invalidate_prefix(("products_page", scope))
+        return category_id
+
+    async def build_search_index(self) -> int:
         try:
-            result = self.client.table("categories").select("*").eq("is_active", True).order("sort_order").execute()
-            return result.data if result and result.data else []
+            categories = await self.client.table("categories").select("id, name, is_active").eq("is_active", True).execute()
+            products = await self.client.table("products").select("*").eq("is_active", True).execute()
+            self.search_index.build(categories.data or [], products.data or [])
+            return len(self.search_index)
+        except Exception:
+            return 0
+
+    async def get_categories(self) -> list:
+        cached = self.catalog_cache.get(("categories",))
+        if cached is not None:
+            return cached
+        try:
+            result = await self.client.table("categories").select("*").eq("is_active", True).order("sort_order").execute()
+            categories = result.data if result and result.data else []
+            self.catalog_cache.set(("categories",), categories)
+            return categories
         except Exception:
             return []
 
-    def get_category(self, category_id: int) -> Optional[dict]:
+    async def get_category(self, category_id: int) -> Optional[dict]:
+        cached = self.catalog_cache.get(("category", category_id))
+        if cached is not None:
+            return cached
         try:
-            result = self.client.table("categories").select("*").eq("id", category_id).maybe_single().execute()
-            return result.data if result else None
+            result = await self.client.table("categories").select("*").eq("id", category_id).maybe_single().execute()
+            category = result.data if result else None
+            if category:
+                self.catalog_cache.set(("category", category_id), category)
+            return category
         except Exception:
             return None
 
-    def create_category(self, name: str, emoji: str = "", description: str = None) -> Optional[dict]:
+    async def create_category(self, name: str, emoji: str = "", description: str = None) -> Optional[dict]:
         try:
             data = {"name": name, "emoji": emoji, "description": description}
-            result = self.client.table("categories").insert(data).execute()
+            result = await self.client.table("categories").insert(data).execute()
+            if result and result.data:
+                self.invalidate_category(result.data[0]["id"])
+                self.search_index.upsert_category(result.data[0])
             return result.data[0] if result and result.data else None
         except Exception:
             return None
 
-    def update_category(self, category_id: int, data: dict) -> Optional[dict]:
+    async def update_category(self, category_id: int, data: dict) -> Optional[dict]:
         try:
-            result = self.client.table("categories").update(data).eq("id", category_id).execute()
+            result = await self.client.table("categories").update(data).eq("id", category_id).execute()
+            self.invalidate_category(category_id)
+            if result and result.data:
+                self.search_index.upsert_category(result.data[0])
             return result.data[0] if result and result.data else None
         except Exception:
             return None
 
-    def delete_category(self, category_id: int) -> bool:
+    async def delete_category(self, category_id: int) -> bool:
         try:
-            self.client.table("categories").update({"is_active": False}).eq("id", category_id).execute()
+            await self.client.table("categories").update({"is_active": False}).eq("id", category_id).execute()
+            self.invalidate_category(category_id)
+            self.search_index.remove_category(category_id)
             return True
         except Exception:
             return False
 
-    def get_products(self, category_id: int = None) -> list:
+    async def get_products(self, category_id: int = None) -> list:
+        cached = self.catalog_cache.get(("products", category_id))
+        if cached is not None:
+            return await self.with_stock(cached)
         try:
             query = self.client.table("products").select("*").eq("is_active", True)
             if category_id:
                 query = query.eq("category_id", category_id)
-            result = query.order("id").execute()
-            return result.data if result and result.data else []
+            result = await query.order("id").execute()
+            products = result.data if result and result.data else []
+            self.catalog_cache.set(("products", category_id), products)
+            return await self.with_stock(products)
         except Exception:
             return []
 
-    def get_product(self, product_id: int) -> Optional[dict]:
+    async def get_products_page(self, category_id: int = None, after_id: int = None, before_id: int = None, limit: int = None) -> dict:
+        limit = limit or settings.CATALOG_PAGE_SIZE
+        key = ("products_page", category_id, after_id, before_id, limit)
+        cached = self.catalog_cache.get(key)
+        if cached is not None:
+            return {**cached, "items": await self.with_stock(cached["items"])}
         try:
-            result = self.client.table("products").select("*").eq("id", product_id).maybe_single().execute()
-            return result.data if result else None
+            query = self.client.table("products").select("*").eq("is_active", True)
+            if category_id:
+                query = query.eq("category_id", category_id)
+            if before_id is not None:
+                query = query.lt("id", before_id).order("id", desc=True)
+            else:
+                if after_id is not None:
+                    query = query.gt("id", after_id)
+                query = query.order("id")
+            result = await query.limit(limit + 1).execute()
+            rows = result.data if result and result.data else []
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            if before_id is not None:
+                rows.reverse()
+                has_prev, has_next = has_more, True
+            else:
+                has_prev, has_next = after_id is not None, has_more
+            page = {
+                "items": rows,
+                "prev": rows[0]["id"] if rows and has_prev else None,
+                "next": rows[-1]["id"] if rows and has_next else None
+            }
+            self.catalog_cache.set(key, page)
+            return {**page, "items": await self.with_stock(rows)}
+        except Exception:
+            return {"items": [], "prev": None, "next": None}
+
+    async def get_product(self, product_id: int) -> Optional[dict]:
+        cached = self.catalog_cache.get(("product", product_id))
+        if cached is not None:
+            return (await self.with_stock([cached]))[0]
+        try:
+            result = await self.client.table("products").select("*").eq("id", product_id).maybe_single().execute()
+            product = result.data if result else None
+            if not product:
+                return None
+            self.catalog_cache.set(("product", product_id), product)
+            return (await self.with_stock([product]))[0]
         except Exception:
             return None
 
-    def create_product(self, category_id: int, name: str, price: float, description: str = None, image_url: str = None, product_type: str = "key") -> Optional[dict]:
+    async def create_product(self, category_id: int, name: str, price: float, description: str = None, image_url: str = None, product_type: str = "key") -> Optional[dict]:
         try:
             data = {
                 "category_id": category_id,
@@ -178,57 +354,95 @@ class Database:
                 "image_url": image_url,
                 "product_type": product_type
             }
-            result = self.client.table("products").insert(data).execute()
+            result = await self.client.table("products").insert(data).execute()
+            if result and result.data:
+                self.invalidate_product(result.data[0]["id"], category_id)
+                self.search_index.upsert_product(result.data[0])
             return result.data[0] if result and result.data else None
         except Exception:
             return None
 
-    def update_product(self, product_id: int, data: dict) -> Optional[dict]:
+    async def update_product(self, product_id: int, data: dict) -> Optional[dict]:
         try:
-            result = self.client.table("products").update(data).eq("id", product_id).execute()
+            result = await self.client.table("products").update(data).eq("id", product_id).execute()
+            self.invalidate_product(product_id)
+            if data.get("category_id"):
+                self.invalidate_product(product_id, data["category_id"])
+            if result and result.data:
+                self.search_index.upsert_product(result.data[0])
             return result.data[0] if result and result.data else None
         except Exception:
             return None
 
-    def delete_product(self, product_id: int) -> bool:
+    async def delete_product(self, product_id: int) -> bool:
         try:
-            self.client.table("products").update({"is_active": False}).eq("id", product_id).execute()
+            await self.client.table("products").update({"is_active": False}).eq("id", product_id).execute()
+            self.invalidate_product(product_id)
+            self.search_index.remove_product(product_id)
             return True
         except Exception:
             return False
 
-    def search_products(self, query: str) -> list:
+    async def search_products(self, query: str, limit: int = 10) -> list:
+        if settings.LOCAL_SEARCH_INDEX and self.search_index.ready:
+            return await self.with_stock([self.search_index.get(product_id) for product_id in self.search_index.search(query, limit)])
         try:
-            result = self.client.table("products").select("*").eq("is_active", True).ilike("name", f"%{query}%").execute()
-            return result.data if result and result.data else []
+            result = await self.client.rpc("search_products", {"p_query": query, "p_limit": limit}).execute()
+            return await self.with_stock(result.data) if result and result.data else []
         except Exception:
             return []
 
-    def get_stock_count(self, product_id: int) -> int:
+    async def get_stock_counts(self, product_ids: list) -> dict:
+        counts = {}
+        missing = []
+        for product_id in dict.fromkeys(product_ids):
+            cached = self.stock_cache.get(product_id)
+            if cached is None:
+                missing.append(product_id)
+            else:
+                counts[product_id] = cached
+        if not missing:
+            return counts
         try:
-            result = self.client.table("stock").select("id", count="exact").eq("product_id", product_id).eq("is_sold", False).execute()
-            return result.count if result else 0
+            result = await self.client.rpc("get_stock_counts", {"p_product_ids": missing}).execute()
+            fetched = {row["product_id"]: int(row["available"]) for row in (result.data or [])} if result else {}
+            for product_id in missing:
+                counts[product_id] = fetched.get(product_id, 0)
+                self.stock_cache.set(product_id, counts[product_id])
         except Exception:
-            return 0
+            for product_id in missing:
+                stale = self.stock_cache.get_stale(product_id)
+                if stale is not None:
+                    counts[product_id] = stale
+        return counts
+
+    async def with_stock(self, products: list) -> list:
+        counts = await self.get_stock_counts([p["id"] for p in products])
+        return [{**p, "available_stock": counts.get(p["id"])} for p in products]
 
-    def get_available_stock(self, product_id: int, quantity: int = 1) -> list:
+    async def get_stock_count(self, product_id: int) -> Optional[int]:
+        counts = await self.get_stock_counts([product_id])
+        return counts.get(product_id)
+
+    async def get_available_stock(self, product_id: int, quantity: int = 1) -> list:
         try:
-            result = self.client.table("stock").select("*").eq("product_id", product_id).eq("is_sold", False).limit(quantity).execute()
+            result = await self.client.table("stock").select("*").eq("product_id", product_id).eq("is_sold", False).limit(quantity).execute()
             return result.data if result and result.data else []
         except Exception:
             return []
 
-    def add_stock(self, product_id: int, items: list) -> int:
+    async def add_stock(self, product_id: int, items: list) -> int:
         try:
             data = [{"product_id": product_id, "data": item} for item in items]
-            result = self.client.table("stock").insert(data).execute()
+            result = await self.client.table("stock").insert(data).execute()
+            self.invalidate_stock(product_id)
             return len(result.data) if result and result.data else 0
         except Exception:
             return 0
 
-    def mark_stock_sold(self, stock_ids: list, user_id: int) -> bool:
+    async def mark_stock_sold(self, stock_ids: list, user_id: int) -> bool:
         try:
-            self.client.table("stock").update({
+            await self.client.table("stock").update({
                 "is_sold": True,
                 "sold_to": user_id,
                 "sold_at": datetime.utcnow().isoformat()
@@ -237,22 +451,30 @@ class Database:
         except Exception:
             return False
 
-    def get_cart(self, user_id: int) -> list:
+    async def attach_stock(self, items: list) -> list:
+        counts = await self.get_stock_counts([item["products"]["id"] for item in items if item.get("products")])
+        for item in items:
+            if item.get("products"):
+                item["products"]["available_stock"] = counts.get(item["products"]["id"])
+        return items
+
+    async def get_cart(self, user_id: int, with_stock: bool = True) -> list:
         try:
-            result = self.client.table("cart").select("*, products(*)").eq("user_id", user_id).execute()
-            return result.data if result and result.data else []
+            result = await self.client.table("cart").select("*, products(*)").eq("user_id", user_id).execute()
+            items = result.data if result and result.data else []
+            return await self.attach_stock(items) if with_stock else items
         except Exception:
             return []
 
-    def add_to_cart(self, user_id: int, product_id: int, quantity: int = 1) -> Optional[dict]:
+    async def add_to_cart(self, user_id: int, product_id: int, quantity: int = 1) -> Optional[dict]:
         try:
-            existing = self.client.table("cart").select("*").eq("user_id", user_id).eq("product_id", product_id).maybe_single().execute()
+            existing = await self.client.table("cart").select("*").eq("user_id", user_id).eq("product_id", product_id).maybe_single().execute()
             if existing and existing.data:
                 new_qty = existing.data["quantity"] + quantity
-                result = self.client.table("cart").update({"quantity": new_qty}).eq("id", existing.data["id"]).execute()
+                result = await self.client.table("cart").update({"quantity": new_qty}).eq("id", existing.data["id"]).execute()
                 return result.data[0] if result and result.data else None
             else:
-                result = self.client.table("cart").insert({
+                result = await self.client.table("cart").insert({
                     "user_id": user_id,
                     "product_id": product_id,
                     "quantity": quantity
@@ -261,33 +483,33 @@ class Database:
         except Exception:
             return None
 
-    def update_cart_quantity(self, user_id: int, product_id: int, quantity: int) -> bool:
+    async def update_cart_quantity(self, user_id: int, product_id: int, quantity: int) -> bool:
         try:
             if quantity <= 0:
-                self.client.table("cart").delete().eq("user_id", user_id).eq("product_id", product_id).execute()
+                await self.client.table("cart").delete().eq("user_id", user_id).eq("product_id", product_id).execute()
             else:
-                self.client.table("cart").update({"quantity": quantity}).eq("user_id", user_id).eq("product_id", product_id).execute()
+                await self.client.table("cart").update({"quantity": quantity}).eq("user_id", user_id).eq("product_id", product_id).execute()
             return True
         except Exception:
             return False
 
-    def remove_from_cart(self, user_id: int, product_id: int) -> bool:
+    async def remove_from_cart(self, user_id: int, product_id: int) -> bool:
         try:
-            self.client.table("cart").delete().eq("user_id", user_id).eq("product_id", product_id).execute()
+            await self.client.table("cart").delete().eq("user_id", user_id).eq("product_id", product_id).execute()
             return True
         except Exception:
             return False
 
-    def clear_cart(self, user_id: int) -> bool:
+    async def clear_cart(self, user_id: int) -> bool:
         try:
-            self.client.table("cart").delete().eq("user_id", user_id).execute()
+            await self.client.table("cart").delete().eq("user_id", user_id).execute()
             return True
         except Exception:
             return False
 
-    def get_cart_total(self, user_id: int) -> float:
+    async def get_cart_total(self, user_id: int) -> float:
         try:
-            cart = self.get_cart(user_id)
+            cart = await self.get_cart(user_id, with_stock=False)
             total = 0.0
             for item in cart:
                 if item.get("products"):
@@ -296,7 +518,7 @@ class Database:
         except Exception:
             return 0.0
 
-    def create_order(self, user_id: int, total: float, discount: float = 0, coupon_code: str = None, payment_method: str = "balance") -> Optional[dict]:
+    async def create_order(self, user_id: int, total: float, discount: float = 0, coupon_code: str = None, payment_method: str = "balance") -> Optional[dict]:
         try:
             data = {
                 "user_id": user_id,
@@ -306,12 +528,12 @@ class Database:
                 "status": "completed",
                 "payment_method": payment_method
             }
-            result = self.client.table("orders").insert(data).execute()
+            result = await self.client.table("orders").insert(data).execute()
             return result.data[0] if result and result.data else None
         except Exception:
             return None
 
-    def add_order_item(self, order_id: int, product_id: int, stock_id: int, price: float, quantity: int = 1) -> Optional[dict]:
+    async def add_order_item(self, order_id: int, product_id: int, stock_id: int, price: float, quantity: int = 1) -> Optional[dict]:
         try:
             data = {
                 "order_id": order_id,
@@ -320,35 +542,76 @@ class Database:
                 "price": price,
                 "quantity": quantity
             }
-            result = self.client.table("order_items").insert(data).execute()
+            result = await self.client.table("order_items").insert(data).execute()
             return result.data[0] if result and result.data else None
         except Exception:
             return None
 
-    def get_user_orders(self, user_id: int, limit: int = 10) -> list:
+    async def checkout(self, user_id: int, coupon_code: str = None, payment_method: str = "balance") -> tuple:
+        cached_user = self.user_cache.get(user_id)
+        referrer_id = cached_user.get("referred_by") if cached_user else None
+        try:
+            result = await self.client.rpc("checkout_cart", {
+                "p_user_id": user_id,
+                "p_payment_method": payment_method,
+                "p_coupon_code": coupon_code,
+                "p_referral_commission": settings.REFERRAL_COMMISSION,
+                "p_tier_thresholds": settings.TIER_THRESHOLDS
+            }).execute()
+            self.invalidate_user(user_id)
+            if referrer_id:
+                self.invalidate_user(referrer_id)
+            if not result or not result.data:
+                return None, "Checkout failed"
+            for product_id in {row["product_id"] for row in result.data}:
+                self.invalidate_stock(product_id)
+            return result.data, None
+        except APIError as e:
+            return None, e.message or "Checkout failed"
+        except Exception:
+            return None, "Checkout failed"
+
+    async def get_user_orders(self, user_id: int, limit: int = 10) -> list:
+        try:
+            result = await self.client.table("orders").select("*, order_items(*, products(*), stock(*))").eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
+            return result.data if result and result.data else []
+        except Exception:
+            return []
+
+    async def get_user_order_count(self, user_id: int) -> int:
+        try:
+            result = await self.client.table("orders").select("id", count="exact").eq("user_id", user_id).limit(1).execute()
+            return (result.count or 0) if result else 0
+        except Exception:
+            return 0
+
+    async def get_order_history(self, user_id: int, limit: int = 10, before_id: int = None) -> list:
         try:
-            result = self.client.table("orders").select("*, order_items(*, products(*), stock(*))").eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
+            query = self.client.table("orders").select("id, total, status, created_at, order_items(products(name))").eq("user_id", user_id)
+            if before_id is not None:
+                query = query.lt("id", before_id)
+            result = await query.order("id", desc=True).limit(limit).execute()
             return result.data if result and result.data else []
         except Exception:
             return []
 
-    def get_order(self, order_id: int) -> Optional[dict]:
+    async def get_order(self, order_id: int) -> Optional[dict]:
         try:
-            result = self.client.table("orders").select("*, order_items(*, products(*), stock(*))").eq("id", order_id).maybe_single().execute()
+            result = await self.client.table("orders").select("*, order_items(*, products(*), stock(*))").eq("id", order_id).maybe_single().execute()
             return result.data if result else None
         except Exception:
             return None
 
-    def get_coupon(self, code: str) -> Optional[dict]:
+    async def get_coupon(self, code: str) -> Optional[dict]:
         try:
-            result = self.client.table("coupons").select("*").eq("code", code.upper()).eq("is_active", True).maybe_single().execute()
+            result = await self.client.table("coupons").select("*").eq("code", code.upper()).eq("is_active", True).maybe_single().execute()
             return result.data if result else None
         except Exception:
             return None
 
-    def validate_coupon(self, code: str, cart_total: float) -> tuple:
+    async def validate_coupon(self, code: str, cart_total: float) -> tuple:
         try:
-            coupon = self.get_coupon(code)
+            coupon = await self.get_coupon(code)
             if not coupon:
                 return None, "Invalid coupon code"
             if coupon["max_uses"] and coupon["used_count"] >= coupon["max_uses"]:
@@ -363,11 +626,11 @@ class Database:
         except Exception:
             return None, "Error validating coupon"
 
-    def use_coupon(self, code: str) -> bool:
+    async def use_coupon(self, code: str) -> bool:
         try:
-            coupon = self.get_coupon(code)
+            coupon = await self.get_coupon(code)
             if coupon:
-                self.client.table("coupons").update({"used_count": coupon["used_count"] + 1}).eq("id", coupon["id"]).execute()
+                await self.client.table("coupons").update({"used_count": coupon["used_count"] + 1}).eq("id", coupon["id"]).execute()
                 return True
             return False
         except Exception:
@@ -383,7 +646,7 @@ class Database:
         except Exception:
             return 0
 
-    def create_coupon(self, code: str, discount_percent: int = None, discount_amount: float = None, min_purchase: float = 0, max_uses: int = None, expires_at: str = None) -> Optional[dict]:
+    async def create_coupon(self, code: str, discount_percent: int = None, discount_amount: float = None, min_purchase: float = 0, max_uses: int = None, expires_at: str = None) -> Optional[dict]:
         try:
             data = {
                 "code": code.upper(),
@@ -393,21 +656,21 @@ class Database:
                 "max_uses": max_uses,
                 "expires_at": expires_at
             }
-            result = self.client.table("coupons").insert(data).execute()
+            result = await self.client.table("coupons").insert(data).execute()
             return result.data[0] if result and result.data else None
         except Exception:
             return None
 
-    def get_wishlist(self, user_id: int) -> list:
+    async def get_wishlist(self, user_id: int) -> list:
         try:
-            result = self.client.table("wishlist").select("*, products(*)").eq("user_id", user_id).execute()
-            return result.data if result and result.data else []
+            result = await self.client.table("wishlist").select("*, products(*)").eq("user_id", user_id).execute()
+            return await self.attach_stock(result.data) if result and result.data else []
         except Exception:
             return []
 
-    def add_to_wishlist(self, user_id: int, product_id: int) -> bool:
+    async def add_to_wishlist(self, user_id: int, product_id: int) -> bool:
         try:
-            self.client.table("wishlist").insert({
+            await self.client.table("wishlist").insert({
                 "user_id": user_id,
                 "product_id": product_id
             }).execute()
@@ -415,57 +678,57 @@ class Database:
         except Exception:
             return False
 
-    def remove_from_wishlist(self, user_id: int, product_id: int) -> bool:
+    async def remove_from_wishlist(self, user_id: int, product_id: int) -> bool:
         try:
-            self.client.table("wishlist").delete().eq("user_id", user_id).eq("product_id", product_id).execute()
+            await self.client.table("wishlist").delete().eq("user_id", user_id).eq("product_id", product_id).execute()
             return True
         except Exception:
             return False
 
-    def is_in_wishlist(self, user_id: int, product_id: int) -> bool:
+    async def is_in_wishlist(self, user_id: int, product_id: int) -> bool:
         try:
-            result = self.client.table("wishlist").select("id").eq("user_id", user_id).eq("product_id", product_id).maybe_single().execute()
+            result = await self.client.table("wishlist").select("id").eq("user_id", user_id).eq("product_id", product_id).maybe_single().execute()
             return result is not None and result.data is not None
         except Exception:
             return False
 
-    def create_ticket(self, user_id: int, subject: str) -> Optional[dict]:
+    async def create_ticket(self, user_id: int, subject: str) -> Optional[dict]:
         try:
             data = {"user_id": user_id, "subject": subject, "status": "open"}
-            result = self.client.table("support_tickets").insert(data).execute()
+            result = await self.client.table("support_tickets").insert(data).execute()
             return result.data[0] if result and result.data else None
         except Exception:
             return None
 
-    def get_user_tickets(self, user_id: int) -> list:
+    async def get_user_tickets(self, user_id: int) -> list:
         try:
-            result = self.client.table("support_tickets").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
+            result = await self.client.table("support_tickets").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
             return result.data if result and result.data else []
         except Exception:
             return []
 
-    def get_ticket(self, ticket_id: int) -> Optional[dict]:
+    async def get_ticket(self, ticket_id: int) -> Optional[dict]:
         try:
-            result = self.client.table("support_tickets").select("*, ticket_messages(*)").eq("id", ticket_id).maybe_single().execute()
+            result = await self.client.table("support_tickets").select("*, ticket_messages(*)").eq("id", ticket_id).maybe_single().execute()
             return result.data if result else None
         except Exception:
             return None
 
-    def get_open_tickets(self) -> list:
+    async def get_open_tickets(self) -> list:
         try:
-            result = self.client.table("support_tickets").select("*, users(username, first_name)").in_("status", ["open", "in_progress"]).order("created_at").execute()
+            result = await self.client.table("support_tickets").select("*, users(username, first_name)").in_("status", ["open", "in_progress"]).order("created_at").execute()
             return result.data if result and result.data else []
         except Exception:
             return []
 
-    def update_ticket_status(self, ticket_id: int, status: str) -> bool:
+    async def update_ticket_status(self, ticket_id: int, status: str) -> bool:
         try:
-            self.client.table("support_tickets").update({"status": status, "updated_at": datetime.utcnow().isoformat()}).eq("id", ticket_id).execute()
+            await self.client.table("support_tickets").update({"status": status, "updated_at": datetime.utcnow().isoformat()}).eq("id", ticket_id).execute()
             return True
         except Exception:
             return False
 
-    def add_ticket_message(self, ticket_id: int, user_id: int, message: str, is_admin: bool = False) -> Optional[dict]:
+    async def add_ticket_message(self, ticket_id: int, user_id: int, message: str, is_admin: bool = False) -> Optional[dict]:
         try:
             data = {
                 "ticket_id": ticket_id,
@@ -473,34 +736,80 @@ class Database:
                 "message": message,
                 "is_admin": is_admin
             }
-            result = self.client.table("ticket_messages").insert(data).execute()
-            self.client.table("support_tickets").update({"updated_at": datetime.utcnow().isoformat()}).eq("id", ticket_id).execute()
+            result = await self.client.table("ticket_messages").insert(data).execute()
+            await self.client.table("support_tickets").update({"updated_at": datetime.utcnow().isoformat()}).eq("id", ticket_id).execute()
             return result.data[0] if result and result.data else None
         except Exception:
             return None
 
-    def get_setting(self, key: str) -> Optional[str]:
+    async def load_settings(self) -> Optional[dict]:
         try:
-            result = self.client.table("settings").select("value").eq("key", key).maybe_single().execute()
-            return result.data["value"] if result and result.data else None
+            result = await self.client.table("settings").select("key, value").execute()
+            values = {row["key"]: row["value"] for row in (result.data or [])} if result else {}
+            self.settings_cache.set("settings", values)
+            return values
         except Exception:
             return None
 
-    def set_setting(self, key: str, value: str) -> bool:
+    async def get_setting(self, key: str) -> Optional[str]:
+        values = self.settings_cache.get("settings")
+        if values is None:
+            values = await self.load_settings()
+        return values.get(key) if values else None
+
+    async def set_setting(self, key: str, value: str) -> bool:
         try:
-            self.client.table("settings").upsert({
+            await self.client.table("settings").upsert({
                 "key": key,
                 "value": value,
                 "updated_at": datetime.utcnow().isoformat()
             }).execute()
+            values = self.settings_cache.get("settings")
+            if values is not None:
+                values[key] = value
+            self.publish("settings")
             return True
         except Exception:
             return False
 
-    def get_referral_stats(self, user_id: int) -> dict:
+    async def get_media_file_id(self, source: str) -> Optional[str]:
+        cached = self.media_cache.get(source)
+        if cached is not None:
+            return cached or None
+        try:
+            result = await self.client.table("media_cache").select("file_id").eq("source", source).maybe_single().execute()
+            file_id = result.data["file_id"] if result and result.data else ""
+            self.media_cache.set(source, file_id)
+            return file_id or None
+        except Exception:
+            return None
+
+    async def set_media_file_id(self, source: str, file_id: str) -> bool:
+        self.media_cache.set(source, file_id)
+        self.publish("media", source)
         try:
-            result = self.client.table("users").select("id", count="exact").eq("referred_by", user_id).execute()
-            user = self.get_user(user_id)
+            await self.client.table("media_cache").upsert({
+                "source": source,
+                "file_id": file_id,
+                "updated_at": datetime.utcnow().isoformat()
+            }).execute()
+            return True
+        except Exception:
+            return False
+
+    async def forget_media_file_id(self, source: str) -> bool:
+        self.media_cache.set(source, "")
+        self.publish("media", source)
+        try:
+            await self.client.table("media_cache").delete().eq("source", source).execute()
+            return True
+        except Exception:
+            return False
+
+    async def get_referral_stats(self, user_id: int) -> dict:
+        try:
+            result = await self.client.table("users").select("id", count="exact").eq("referred_by", user_id).execute()
+            user = await self.get_user(user_id)
             return {
                 "referral_count": result.count if result else 0,
                 "referral_earnings": float(user["referral_earnings"]) if user else 0,
@@ -509,51 +818,45 @@ class Database:
         except Exception:
             return {"referral_count": 0, "referral_earnings": 0, "referral_code": None}
 
-    def process_referral_commission(self, referred_user_id: int, purchase_amount: float) -> float:
-        try:
-            user = self.get_user(referred_user_id)
-            if not user or not user.get("referred_by"):
-                return 0
-            commission = purchase_amount * (settings.REFERRAL_COMMISSION / 100)
-            referrer = self.get_user(user["referred_by"])
-            if referrer:
-                new_earnings = float(referrer["referral_earnings"]) + commission
-                new_balance = float(referrer["balance"]) + commission
-                self.update_user(referrer["id"], {
-                    "referral_earnings": new_earnings,
-                    "balance": new_balance
-                })
-                self.client.table("transactions").insert({
-                    "user_id": referrer["id"],
-                    "type": "referral",
-                    "amount": commission,
-                    "description": "Commission from referral purchase"
-                }).execute()
-            return commission
+    async def claim_daily_spin(self, user_id: int, reward: float) -> Optional[bool]:
+        try:
+            result = await self.client.rpc("claim_daily_spin", {
+                "p_user_id": user_id,
+                "p_reward": reward
+            }).execute()
+            self.invalidate_user(user_id)
+            return bool(result.data[0]["claimed"]) if result and result.data else None
         except Exception:
-            return 0
+            self.invalidate_user(user_id)
+            return None
 
-    def get_stats(self) -> dict:
+    async def get_stats(self) -> dict:
         try:
-            users = self.client.table("users").select("id", count="exact").execute()
-            orders = self.client.table("orders").select("id", count="exact").eq("status", "completed").execute()
-            revenue = self.client.table("orders").select("total").eq("status", "completed").execute()
-            total_revenue = sum(float(o["total"]) for o in (revenue.data or [])) if revenue else 0
-            products = self.client.table("products").select("id", count="exact").eq("is_active", True).execute()
-            stock = self.client.table("stock").select("id", count="exact").eq("is_sold", False).execute()
+            result = await self.client.rpc("get_shop_stats", {}).execute()
+            stats = result.data[0] if result and result.data else {}
             return {
-                "total_users": users.count if users else 0,
-                "total_orders": orders.count if orders else 0,
-                "total_revenue": total_revenue,
-                "total_products": products.count if products else 0,
-                "total_stock": stock.count if stock else 0
+                "total_users": stats.get("total_users", 0),
+                "total_orders": stats.get("total_orders", 0),
+                "total_revenue": float(stats.get("total_revenue") or 0),
+                "total_products": stats.get("total_products", 0),
+                "total_stock": stats.get("total_stock", 0)
             }
         except Exception:
             return {"total_users": 0, "total_orders": 0, "total_revenue": 0, "total_products": 0, "total_stock": 0}
 
-    def get_transactions(self, user_id: int, limit: int = 10) -> list:
+    async def reconcile_stats(self) -> bool:
+        try:
+            await self.client.rpc("reconcile_shop_stats", {}).execute()
+            return True
+        except Exception:
+            return False
+
+    async def get_transactions(self, user_id: int, limit: int = 10, before_id: int = None) -> list:
         try:
-            result = self.client.table("transactions").select("*").eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
+            query = self.client.table("transactions").select("id, type, amount, description, created_at").eq("user_id", user_id)
+            if before_id is not None:
+                query = query.lt("id", before_id)
+            result = await query.order("id", desc=True).limit(limit).execute()
             return result.data if result and result.data else []
         except Exception:
             return []
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Dict, Union
+
+import httpx
+from httpx import Timeout
+from postgrest import AsyncPostgrestClient
+from src.config import settings
+from src.logger import logger
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class BoundedAsyncClient(httpx.AsyncClient):
+    def __init__(self, *args, max_inflight: int, queue_timeout: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_inflight = max_inflight
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_inflight)
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_in_flight = 0
+        self.peak_queued = 0
+        self.total_requests = 0
+        self.queue_timeouts = 0
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        if self._semaphore.locked():
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.queue_timeouts += 1
+                logger.warning(f"Supabase request queue timeout ({self.in_flight} in flight, {self.queued} queued)")
+                raise httpx.PoolTimeout("Timed out waiting for a free Supabase request slot", request=request)
+            finally:
+                self.queued -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        self.total_requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await super().send(request, **kwargs)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_inflight": self.max_inflight,
+            "peak_in_flight": self.peak_in_flight,
+            "peak_queued": self.peak_queued,
+            "total_requests": self.total_requests,
+            "queue_timeouts": self.queue_timeouts,
+            "saturation": self.in_flight / self.max_inflight if self.max_inflight else 0.0,
+        }
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Union[int, float, Timeout],
+    ) -> BoundedAsyncClient:
+        http2 = settings.SUPABASE_HTTP2
+        if http2 and not http2_available():
+            logger.warning("SUPABASE_HTTP2 is enabled but the 'h2' package is missing, falling back to HTTP/1.1")
+            http2 = False
+
+        return BoundedAsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=settings.SUPABASE_TIMEOUT,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_POOL_SIZE,
+                max_keepalive_connections=settings.SUPABASE_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY,
+            ),
+            max_inflight=settings.SUPABASE_MAX_INFLIGHT,
+            queue_timeout=settings.SUPABASE_QUEUE_TIMEOUT,
+        )
@@ -0,0 +1,199 @@
+/*
+  # Atomic Checkout RPC
+
+  1. New Functions
+    - `checkout_cart(p_user_id, p_payment_method, p_coupon_code, p_referral_commission, p_tier_thresholds)`
+      - Runs the whole purchase in one transaction and one round trip:
+        validates the cart and coupon, checks balance, creates the order,
+        claims stock, writes order items, deducts balance, updates
+        total_spent and tier, pays referral commission, consumes the
+        coupon and clears the cart
+      - Returns one row per delivered stock item, with the order id,
+        totals and the buyer's new balance repeated on every row
+      - Raises (and rolls everything back) on an empty cart, insufficient
+        balance or insufficient stock; the exception message is shown to
+        the user as-is
+
+  2. Notes
+    - Referral commission percentage and tier thresholds are passed in
+      from the bot's settings so there is a single source of truth
+*/
+
+CREATE OR REPLACE FUNCTION checkout_cart(
+  p_user_id bigint,
+  p_payment_method text DEFAULT 'balance',
+  p_coupon_code text DEFAULT NULL,
+  p_referral_commission numeric DEFAULT 10,
+  p_tier_thresholds jsonb DEFAULT '{"bronze": 0, "silver": 50, "gold": 200, "platinum": 500}'
+)
+RETURNS TABLE (
+  order_id int,
+  total numeric,
+  discount numeric,
+  balance numeric,
+  product_id int,
+  product_name text,
+  product_type text,
+  stock_id int,
+  data text
+)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_user users%ROWTYPE;
+  v_coupon coupons%ROWTYPE;
+  v_item record;
+  v_stock record;
+  v_subtotal numeric(10,2) := 0;
+  v_discount numeric(10,2) := 0;
+  v_total numeric(10,2);
+  v_balance numeric(10,2);
+  v_commission numeric(10,2);
+  v_order_id int;
+  v_claimed int;
+  v_tier text;
+  v_items jsonb := '[]'::jsonb;
+BEGIN
+  SELECT * INTO v_user FROM users WHERE id = p_user_id FOR UPDATE;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'User not found';
+  END IF;
+
+  SELECT coalesce(sum(p.price * c.quantity), 0) INTO v_subtotal
+  FROM cart c
+  JOIN products p ON p.id = c.product_id
+  WHERE c.user_id = p_user_id;
+
+  IF NOT EXISTS (
+    SELECT 1 FROM cart c JOIN products p ON p.id = c.product_id WHERE c.user_id = p_user_id
+  ) THEN
+    RAISE EXCEPTION 'Cart expired';
+  END IF;
+
+  IF p_coupon_code IS NOT NULL THEN
+    SELECT * INTO v_coupon
+    FROM coupons
+    WHERE code = upper(p_coupon_code) AND is_active = true
+    FOR UPDATE;
+
+    IF FOUND
+      AND (coalesce(v_coupon.max_uses, 0) = 0 OR v_coupon.used_count < v_coupon.max_uses)
+      AND (v_coupon.expires_at IS NULL OR v_coupon.expires_at > now())
+      AND (v_coupon.min_purchase IS NULL OR v_subtotal >= v_coupon.min_purchase)
+    THEN
+      IF coalesce(v_coupon.discount_percent, 0) > 0 THEN
+        v_discount := v_subtotal * v_coupon.discount_percent / 100;
+      ELSIF coalesce(v_coupon.discount_amount, 0) > 0 THEN
+        v_discount := least(v_coupon.discount_amount, v_subtotal);
+      END IF;
+    ELSE
+      v_coupon := NULL;
+    END IF;
+  END IF;
+
+  v_total := v_subtotal - v_discount;
+
+  IF p_payment_method = 'balance' AND coalesce(v_user.balance, 0) < v_total THEN
+    RAISE EXCEPTION 'Insufficient balance!';
+  END IF;
+
+  INSERT INTO orders (user_id, total, discount_applied, coupon_code, status, payment_method)
+  VALUES (p_user_id, v_total, v_discount, v_coupon.code, 'completed', p_payment_method)
+  RETURNING id INTO v_order_id;
+
+  FOR v_item IN
+    SELECT c.product_id, c.quantity, p.name, p.price, p.product_type
+    FROM cart c
+    JOIN products p ON p.id = c.product_id
+    WHERE c.user_id = p_user_id
+    ORDER BY c.id
+  LOOP
+    v_claimed := 0;
+
+    FOR v_stock IN
+      UPDATE stock
+      SET is_sold = true, sold_to = p_user_id, sold_at = now()
+      WHERE id IN (
+        SELECT s.id FROM stock s
+        WHERE s.product_id = v_item.product_id AND s.is_sold = false
+        ORDER BY s.id
+        LIMIT v_item.quantity
+        FOR UPDATE
+      )
+      RETURNING id, data
+    LOOP
+      INSERT INTO order_items (order_id, product_id, stock_id, price, quantity)
+      VALUES (v_order_id, v_item.product_id, v_stock.id, v_item.price, 1);
+
+      v_items := v_items || jsonb_build_object(
+        'product_id', v_item.product_id,
+        'product_name', v_item.name,
+        'product_type', coalesce(v_item.product_type, 'key'),
+        'stock_id', v_stock.id,
+        'data', v_stock.data
+      );
+      v_claimed := v_claimed + 1;
+    END LOOP;
+
+    IF v_claimed < v_item.quantity THEN
+      RAISE EXCEPTION 'Insufficient stock for %!', v_item.name;
+    END IF;
+  END LOOP;
+
+  IF p_payment_method = 'balance' THEN
+    UPDATE users SET balance = coalesce(balance, 0) - v_total WHERE id = p_user_id;
+
+    INSERT INTO transactions (user_id, type, amount, description)
+    VALUES (p_user_id, 'purchase', -v_total, 'Purchase - Order #' || v_order_id);
+  END IF;
+
+  SELECT t.key INTO v_tier
+  FROM jsonb_each_text(p_tier_thresholds) AS t
+  WHERE t.value::numeric <= coalesce(v_user.total_spent, 0) + v_total
+  ORDER BY t.value::numeric DESC
+  LIMIT 1;
+
+  UPDATE users
+  SET total_spent = coalesce(total_spent, 0) + v_total,
+      tier = coalesce(v_tier, tier)
+  WHERE id = p_user_id
+  RETURNING balance INTO v_balance;
+
+  IF v_user.referred_by IS NOT NULL AND v_user.referred_by <> p_user_id THEN
+    v_commission := v_total * p_referral_commission / 100;
+
+    UPDATE users
+    SET balance = coalesce(balance, 0) + v_commission,
+        referral_earnings = coalesce(referral_earnings, 0) + v_commission
+    WHERE id = v_user.referred_by;
+
+    IF FOUND THEN
+      INSERT INTO transactions (user_id, type, amount, description)
+      VALUES (v_user.referred_by, 'referral', v_commission, 'Commission from referral purchase');
+    END IF;
+  END IF;
+
+  IF v_coupon.id IS NOT NULL THEN
+    UPDATE coupons SET used_count = coalesce(used_count, 0) + 1 WHERE id = v_coupon.id;
+  END IF;
+
+  DELETE FROM cart WHERE user_id = p_user_id;
+
+  RETURN QUERY
+  SELECT
+    v_order_id,
+    v_total::numeric,
+    v_discount::numeric,
+    v_balance::numeric,
+    (i->>'product_id')::int,
+    i->>'product_name',
+    i->>'product_type',
+    (i->>'stock_id')::int,
+    i->>'data'
+  FROM jsonb_array_elements(v_items) AS i;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION checkout_cart(bigint, text, text, numeric, jsonb) TO service_role;
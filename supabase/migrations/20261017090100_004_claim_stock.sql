@@ -0,0 +1,213 @@
+/*
+  # Contention-free Stock Claiming
+
+  1. New Functions
+    - `claim_stock(p_product_id, p_quantity, p_user_id)`
+      - Marks up to `p_quantity` unsold stock rows as sold to `p_user_id`
+        and returns them, in a single statement
+      - Uses `FOR UPDATE SKIP LOCKED`, so concurrent buyers of the same
+        product claim disjoint rows instead of waiting on each other or
+        selling the same key twice
+      - May return fewer rows than requested when stock runs out
+
+  2. Changes
+    - `checkout_cart` claims stock through `claim_stock`
+    - `idx_stock_unsold` now covers `(product_id, id)` so the ordered
+      claim scan is served by the partial index
+*/
+
+CREATE OR REPLACE FUNCTION claim_stock(
+  p_product_id int,
+  p_quantity int,
+  p_user_id bigint
+)
+RETURNS SETOF stock
+LANGUAGE sql
+SET search_path = public
+AS $$
+  UPDATE stock
+  SET is_sold = true, sold_to = p_user_id, sold_at = now()
+  WHERE id IN (
+    SELECT id FROM stock
+    WHERE product_id = p_product_id AND is_sold = false
+    ORDER BY id
+    LIMIT p_quantity
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING *;
+$$;
+
+GRANT EXECUTE ON FUNCTION claim_stock(int, int, bigint) TO service_role;
+
+DROP INDEX IF EXISTS idx_stock_unsold;
+CREATE INDEX IF NOT EXISTS idx_stock_unsold ON stock(product_id, id) WHERE is_sold = false;
+
+CREATE OR REPLACE FUNCTION checkout_cart(
+  p_user_id bigint,
+  p_payment_method text DEFAULT 'balance',
+  p_coupon_code text DEFAULT NULL,
+  p_referral_commission numeric DEFAULT 10,
+  p_tier_thresholds jsonb DEFAULT '{"bronze": 0, "silver": 50, "gold": 200, "platinum": 500}'
+)
+RETURNS TABLE (
+  order_id int,
+  total numeric,
+  discount numeric,
+  balance numeric,
+  product_id int,
+  product_name text,
+  product_type text,
+  stock_id int,
+  data text
+)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_user users%ROWTYPE;
+  v_coupon coupons%ROWTYPE;
+  v_item record;
+  v_stock record;
+  v_subtotal numeric(10,2) := 0;
+  v_discount numeric(10,2) := 0;
+  v_total numeric(10,2);
+  v_balance numeric(10,2);
+  v_commission numeric(10,2);
+  v_order_id int;
+  v_claimed int;
+  v_tier text;
+  v_items jsonb := '[]'::jsonb;
+BEGIN
+  SELECT * INTO v_user FROM users WHERE id = p_user_id FOR UPDATE;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'User not found';
+  END IF;
+
+  SELECT coalesce(sum(p.price * c.quantity), 0) INTO v_subtotal
+  FROM cart c
+  JOIN products p ON p.id = c.product_id
+  WHERE c.user_id = p_user_id;
+
+  IF NOT EXISTS (
+    SELECT 1 FROM cart c JOIN products p ON p.id = c.product_id WHERE c.user_id = p_user_id
+  ) THEN
+    RAISE EXCEPTION 'Cart expired';
+  END IF;
+
+  IF p_coupon_code IS NOT NULL THEN
+    SELECT * INTO v_coupon
+    FROM coupons
+    WHERE code = upper(p_coupon_code) AND is_active = true
+    FOR UPDATE;
+
+    IF FOUND
+      AND (coalesce(v_coupon.max_uses, 0) = 0 OR v_coupon.used_count < v_coupon.max_uses)
+      AND (v_coupon.expires_at IS NULL OR v_coupon.expires_at > now())
+      AND (v_coupon.min_purchase IS NULL OR v_subtotal >= v_coupon.min_purchase)
+    THEN
+      IF coalesce(v_coupon.discount_percent, 0) > 0 THEN
+        v_discount := v_subtotal * v_coupon.discount_percent / 100;
+      ELSIF coalesce(v_coupon.discount_amount, 0) > 0 THEN
+        v_discount := least(v_coupon.discount_amount, v_subtotal);
+      END IF;
+    ELSE
+      v_coupon := NULL;
+    END IF;
+  END IF;
+
+  v_total := v_subtotal - v_discount;
+
+  IF p_payment_method = 'balance' AND coalesce(v_user.balance, 0) < v_total THEN
+    RAISE EXCEPTION 'Insufficient balance!';
+  END IF;
+
+  INSERT INTO orders (user_id, total, discount_applied, coupon_code, status, payment_method)
+  VALUES (p_user_id, v_total, v_discount, v_coupon.code, 'completed', p_payment_method)
+  RETURNING id INTO v_order_id;
+
+  FOR v_item IN
+    SELECT c.product_id, c.quantity, p.name, p.price, p.product_type
+    FROM cart c
+    JOIN products p ON p.id = c.product_id
+    WHERE c.user_id = p_user_id
+    ORDER BY c.id
+  LOOP
+    v_claimed := 0;
+
+    FOR v_stock IN
+      SELECT s.id, s.data FROM claim_stock(v_item.product_id, v_item.quantity, p_user_id) AS s
+    LOOP
+      INSERT INTO order_items (order_id, product_id, stock_id, price, quantity)
+      VALUES (v_order_id, v_item.product_id, v_stock.id, v_item.price, 1);
+
+      v_items := v_items || jsonb_build_object(
+        'product_id', v_item.product_id,
+        'product_name', v_item.name,
+        'product_type', coalesce(v_item.product_type, 'key'),
+        'stock_id', v_stock.id,
+        'data', v_stock.data
+      );
+      v_claimed := v_claimed + 1;
+    END LOOP;
+
+    IF v_claimed < v_item.quantity THEN
+      RAISE EXCEPTION 'Insufficient stock for %!', v_item.name;
+    END IF;
+  END LOOP;
+
+  IF p_payment_method = 'balance' THEN
+    UPDATE users SET balance = coalesce(balance, 0) - v_total WHERE id = p_user_id;
+
+    INSERT INTO transactions (user_id, type, amount, description)
+    VALUES (p_user_id, 'purchase', -v_total, 'Purchase - Order #' || v_order_id);
+  END IF;
+
+  SELECT t.key INTO v_tier
+  FROM jsonb_each_text(p_tier_thresholds) AS t
+  WHERE t.value::numeric <= coalesce(v_user.total_spent, 0) + v_total
+  ORDER BY t.value::numeric DESC
+  LIMIT 1;
+
+  UPDATE users
+  SET total_spent = coalesce(total_spent, 0) + v_total,
+      tier = coalesce(v_tier, tier)
+  WHERE id = p_user_id
+  RETURNING balance INTO v_balance;
+
+  IF v_user.referred_by IS NOT NULL AND v_user.referred_by <> p_user_id THEN
+    v_commission := v_total * p_referral_commission / 100;
+
+    UPDATE users
+    SET balance = coalesce(balance, 0) + v_commission,
+        referral_earnings = coalesce(referral_earnings, 0) + v_commission
+    WHERE id = v_user.referred_by;
+
+    IF FOUND THEN
+      INSERT INTO transactions (user_id, type, amount, description)
+      VALUES (v_user.referred_by, 'referral', v_commission, 'Commission from referral purchase');
+    END IF;
+  END IF;
+
+  IF v_coupon.id IS NOT NULL THEN
+    UPDATE coupons SET used_count = coalesce(used_count, 0) + 1 WHERE id = v_coupon.id;
+  END IF;
+
+  DELETE FROM cart WHERE user_id = p_user_id;
+
+  RETURN QUERY
+  SELECT
+    v_order_id,
+    v_total::numeric,
+    v_discount::numeric,
+    v_balance::numeric,
+    (i->>'product_id')::int,
+    i->>'product_name',
+    i->>'product_type',
+    (i->>'stock_id')::int,
+    i->>'data'
+  FROM jsonb_array_elements(v_items) AS i;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION checkout_cart(bigint, text, text, numeric, jsonb) TO service_role;
@@ -0,0 +1,38 @@
+/*
+  # Batched Available Stock Counts
+
+  1. New Functions
+    - `get_stock_counts(p_product_ids)` - unsold stock per product for a
+      batch of products, counted from the `idx_stock_unsold
+      (product_id, id)` partial index without touching `products`
+
+  2. Purpose
+    - Replaces a `count(*)` over `stock` per listed product with one
+      call per listing
+    - The count is not denormalized onto `products`: a counter column
+      would be updated inside every checkout and stock claim, holding the
+      product row lock until commit, so concurrent buyers of one product
+      would queue behind each other again despite the `SKIP LOCKED` claim
+      in `claim_stock`
+
+  3. Notes
+    - The bot caches these counts for a few seconds
+      (`STOCK_CACHE_TTL`) and merges them into the product rows it shows
+*/
+
+CREATE OR REPLACE FUNCTION get_stock_counts(p_product_ids int[])
+RETURNS TABLE (
+  product_id int,
+  available bigint
+)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT s.product_id, count(*)
+  FROM stock s
+  WHERE s.product_id = ANY(p_product_ids) AND s.is_sold = false
+  GROUP BY s.product_id;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_stock_counts(int[]) TO service_role;
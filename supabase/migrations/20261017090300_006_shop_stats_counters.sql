@@ -0,0 +1,258 @@
+/*
+  # Live Counters for the Admin Dashboard
+
+  1. New Tables
+    - `shop_stats` - trigger-maintained running totals
+      - `slot` (int, primary key) - one of 16 counter slots
+      - `user_count` (bigint) - registered users
+      - `order_count` (bigint) - completed orders
+      - `revenue` (decimal) - sum of completed order totals
+      - `product_count` (bigint) - active products
+      - `stock_count` (bigint) - unsold stock items
+
+  2. Triggers
+    - Statement-level triggers on `users`, `orders`, `products` and
+      `stock` add the net change of each statement to a random slot, so
+      concurrent checkouts don't queue behind a single hot counter row
+
+  3. New Functions
+    - `get_shop_stats()` - sums the slots and returns one row, so the
+      dashboard costs one tiny read regardless of table sizes
+*/
+
+CREATE TABLE IF NOT EXISTS shop_stats (
+  slot int PRIMARY KEY,
+  user_count bigint NOT NULL DEFAULT 0,
+  order_count bigint NOT NULL DEFAULT 0,
+  revenue decimal(14,2) NOT NULL DEFAULT 0.00,
+  product_count bigint NOT NULL DEFAULT 0,
+  stock_count bigint NOT NULL DEFAULT 0
+);
+
+ALTER TABLE shop_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access to shop_stats"
+  ON shop_stats
+  FOR ALL
+  TO service_role
+  USING (true)
+  WITH CHECK (true);
+
+INSERT INTO shop_stats (slot)
+SELECT generate_series(0, 15)
+ON CONFLICT (slot) DO NOTHING;
+
+UPDATE shop_stats SET
+  user_count = (SELECT count(*) FROM users),
+  order_count = (SELECT count(*) FROM orders WHERE status = 'completed'),
+  revenue = (SELECT coalesce(sum(total), 0) FROM orders WHERE status = 'completed'),
+  product_count = (SELECT count(*) FROM products WHERE is_active = true),
+  stock_count = (SELECT count(*) FROM stock WHERE is_sold = false)
+WHERE slot = 0;
+
+UPDATE shop_stats SET
+  user_count = 0, order_count = 0, revenue = 0, product_count = 0, stock_count = 0
+WHERE slot <> 0;
+
+CREATE OR REPLACE FUNCTION bump_shop_stats(
+  d_users bigint,
+  d_orders bigint,
+  d_revenue numeric,
+  d_products bigint,
+  d_stock bigint
+)
+RETURNS void
+LANGUAGE sql
+SET search_path = public
+AS $$
+  UPDATE shop_stats
+  SET user_count = user_count + d_users,
+      order_count = order_count + d_orders,
+      revenue = revenue + d_revenue,
+      product_count = product_count + d_products,
+      stock_count = stock_count + d_stock
+  WHERE slot = floor(random() * 16)::int;
+$$;
+
+CREATE OR REPLACE FUNCTION shop_stats_users()
+RETURNS trigger
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_delta bigint;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    SELECT count(*) INTO v_delta FROM new_rows;
+  ELSE
+    SELECT -count(*) INTO v_delta FROM old_rows;
+  END IF;
+
+  IF v_delta <> 0 THEN
+    PERFORM bump_shop_stats(v_delta, 0, 0, 0, 0);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION shop_stats_orders()
+RETURNS trigger
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_new_count bigint := 0;
+  v_new_revenue numeric := 0;
+  v_old_count bigint := 0;
+  v_old_revenue numeric := 0;
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    SELECT count(*), coalesce(sum(total), 0) INTO v_new_count, v_new_revenue
+    FROM new_rows WHERE status = 'completed';
+  END IF;
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    SELECT count(*), coalesce(sum(total), 0) INTO v_old_count, v_old_revenue
+    FROM old_rows WHERE status = 'completed';
+  END IF;
+
+  IF v_new_count <> v_old_count OR v_new_revenue <> v_old_revenue THEN
+    PERFORM bump_shop_stats(0, v_new_count - v_old_count, v_new_revenue - v_old_revenue, 0, 0);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION shop_stats_products()
+RETURNS trigger
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_new bigint := 0;
+  v_old bigint := 0;
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    SELECT count(*) INTO v_new FROM new_rows WHERE is_active = true;
+  END IF;
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    SELECT count(*) INTO v_old FROM old_rows WHERE is_active = true;
+  END IF;
+
+  IF v_new <> v_old THEN
+    PERFORM bump_shop_stats(0, 0, 0, v_new - v_old, 0);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION shop_stats_stock()
+RETURNS trigger
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_new bigint := 0;
+  v_old bigint := 0;
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    SELECT count(*) INTO v_new FROM new_rows WHERE is_sold = false;
+  END IF;
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    SELECT count(*) INTO v_old FROM old_rows WHERE is_sold = false;
+  END IF;
+
+  IF v_new <> v_old THEN
+    PERFORM bump_shop_stats(0, 0, 0, 0, v_new - v_old);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS shop_stats_users_insert ON users;
+CREATE TRIGGER shop_stats_users_insert
+  AFTER INSERT ON users
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_users();
+
+DROP TRIGGER IF EXISTS shop_stats_users_delete ON users;
+CREATE TRIGGER shop_stats_users_delete
+  AFTER DELETE ON users
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_users();
+
+DROP TRIGGER IF EXISTS shop_stats_orders_insert ON orders;
+CREATE TRIGGER shop_stats_orders_insert
+  AFTER INSERT ON orders
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_orders();
+
+DROP TRIGGER IF EXISTS shop_stats_orders_update ON orders;
+CREATE TRIGGER shop_stats_orders_update
+  AFTER UPDATE ON orders
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_orders();
+
+DROP TRIGGER IF EXISTS shop_stats_orders_delete ON orders;
+CREATE TRIGGER shop_stats_orders_delete
+  AFTER DELETE ON orders
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_orders();
+
+DROP TRIGGER IF EXISTS shop_stats_products_insert ON products;
+CREATE TRIGGER shop_stats_products_insert
+  AFTER INSERT ON products
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_products();
+
+DROP TRIGGER IF EXISTS shop_stats_products_update ON products;
+CREATE TRIGGER shop_stats_products_update
+  AFTER UPDATE ON products
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_products();
+
+DROP TRIGGER IF EXISTS shop_stats_products_delete ON products;
+CREATE TRIGGER shop_stats_products_delete
+  AFTER DELETE ON products
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_products();
+
+DROP TRIGGER IF EXISTS shop_stats_stock_insert ON stock;
+CREATE TRIGGER shop_stats_stock_insert
+  AFTER INSERT ON stock
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_stock();
+
+DROP TRIGGER IF EXISTS shop_stats_stock_update ON stock;
+CREATE TRIGGER shop_stats_stock_update
+  AFTER UPDATE ON stock
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_stock();
+
+DROP TRIGGER IF EXISTS shop_stats_stock_delete ON stock;
+CREATE TRIGGER shop_stats_stock_delete
+  AFTER DELETE ON stock
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION shop_stats_stock();
+
+CREATE OR REPLACE FUNCTION get_shop_stats()
+RETURNS TABLE (
+  total_users bigint,
+  total_orders bigint,
+  total_revenue numeric,
+  total_products bigint,
+  total_stock bigint
+)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT
+    coalesce(sum(user_count), 0)::bigint,
+    coalesce(sum(order_count), 0)::bigint,
+    coalesce(sum(revenue), 0),
+    coalesce(sum(product_count), 0)::bigint,
+    coalesce(sum(stock_count), 0)::bigint
+  FROM shop_stats;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_shop_stats() TO service_role;
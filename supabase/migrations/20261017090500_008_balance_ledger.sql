@@ -0,0 +1,444 @@
+/*
+  # Append-Only Balance Ledger
+
+  1. New Tables
+    - `balance_snapshots` - rolled-forward balance per user
+      - `user_id` (bigint, primary key)
+      - `balance` (decimal) - balance as of `last_tx_id`
+      - `referral_earnings` (decimal) - referral earnings as of `last_tx_id`
+      - `last_tx_id` (int) - newest `transactions.id` folded into the snapshot
+      - `updated_at` (timestamptz)
+
+  2. Ledger Mode
+    - Switched by the `balance_mode` setting (`column` or `ledger`) via
+      `enable_balance_ledger()` / `disable_balance_ledger()`
+    - In ledger mode `transactions` is the source of truth: the live
+      balance is the snapshot plus the deltas appended after it, and
+      credits are plain inserts that never lock the `users` row
+    - Debits still serialize per user on the `users` row so the balance
+      check and the deduction can't interleave
+
+  3. New Functions
+    - `ledger_balance(p_user_id)` / `ledger_referral_earnings(p_user_id)`
+    - `current_balance(p_user_id)` - live balance in either mode
+    - `live_balance(users)` / `live_referral_earnings(users)` - computed
+      columns, selectable through the REST API
+    - `compact_balance_ledger(p_settle)` - rolls snapshots forward over
+      settled transactions and refreshes `users.balance`; a no-op in
+      column mode
+
+  4. Changes
+    - `apply_balance_delta` appends only in ledger mode
+    - `checkout_cart` checks and returns the live balance, and takes a
+      NO KEY UPDATE lock on the buyer so concurrent credits don't wait
+*/
+
+INSERT INTO settings (key, value)
+VALUES ('balance_mode', 'column')
+ON CONFLICT (key) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS balance_snapshots (
+  user_id bigint PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+  balance decimal(10,2) NOT NULL DEFAULT 0.00,
+  referral_earnings decimal(10,2) NOT NULL DEFAULT 0.00,
+  last_tx_id int NOT NULL DEFAULT 0,
+  updated_at timestamptz DEFAULT now()
+);
+
+ALTER TABLE balance_snapshots ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access to balance_snapshots"
+  ON balance_snapshots
+  FOR ALL
+  TO service_role
+  USING (true)
+  WITH CHECK (true);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_ledger ON transactions(user_id, id);
+
+CREATE OR REPLACE FUNCTION ledger_mode()
+RETURNS boolean
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT coalesce((SELECT value = 'ledger' FROM settings WHERE key = 'balance_mode'), false);
+$$;
+
+CREATE OR REPLACE FUNCTION ledger_balance(p_user_id bigint)
+RETURNS numeric
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT coalesce(s.balance, 0) + coalesce((
+    SELECT sum(t.amount)
+    FROM transactions t
+    WHERE t.user_id = p_user_id AND t.id > coalesce(s.last_tx_id, 0)
+  ), 0)
+  FROM (SELECT 1) AS one
+  LEFT JOIN balance_snapshots s ON s.user_id = p_user_id;
+$$;
+
+CREATE OR REPLACE FUNCTION ledger_referral_earnings(p_user_id bigint)
+RETURNS numeric
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT coalesce(s.referral_earnings, 0) + coalesce((
+    SELECT sum(t.amount)
+    FROM transactions t
+    WHERE t.user_id = p_user_id AND t.type = 'referral' AND t.id > coalesce(s.last_tx_id, 0)
+  ), 0)
+  FROM (SELECT 1) AS one
+  LEFT JOIN balance_snapshots s ON s.user_id = p_user_id;
+$$;
+
+CREATE OR REPLACE FUNCTION live_balance(u users)
+RETURNS numeric
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT CASE WHEN ledger_mode() THEN ledger_balance(u.id) ELSE coalesce(u.balance, 0) END;
+$$;
+
+CREATE OR REPLACE FUNCTION live_referral_earnings(u users)
+RETURNS numeric
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT CASE WHEN ledger_mode() THEN ledger_referral_earnings(u.id) ELSE coalesce(u.referral_earnings, 0) END;
+$$;
+
+CREATE OR REPLACE FUNCTION current_balance(p_user_id bigint)
+RETURNS numeric
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT live_balance(u) FROM users u WHERE u.id = p_user_id;
+$$;
+
+GRANT EXECUTE ON FUNCTION live_balance(users) TO service_role;
+GRANT EXECUTE ON FUNCTION live_referral_earnings(users) TO service_role;
+GRANT EXECUTE ON FUNCTION current_balance(bigint) TO service_role;
+
+CREATE OR REPLACE FUNCTION apply_balance_delta(
+  p_user_id bigint,
+  p_amount numeric,
+  p_type text,
+  p_description text DEFAULT NULL,
+  p_reference_id text DEFAULT NULL
+)
+RETURNS TABLE (new_balance numeric)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_balance numeric(10,2);
+BEGIN
+  IF ledger_mode() THEN
+    IF p_amount < 0 THEN
+      PERFORM 1 FROM users WHERE id = p_user_id FOR NO KEY UPDATE;
+    ELSE
+      PERFORM 1 FROM users WHERE id = p_user_id;
+    END IF;
+    IF NOT FOUND THEN
+      RETURN;
+    END IF;
+
+    INSERT INTO transactions (user_id, type, amount, description, reference_id)
+    VALUES (p_user_id, p_type, p_amount, p_description, p_reference_id);
+
+    RETURN QUERY SELECT ledger_balance(p_user_id);
+    RETURN;
+  END IF;
+
+  UPDATE users
+  SET balance = coalesce(balance, 0) + p_amount,
+      referral_earnings = CASE
+        WHEN p_type = 'referral' THEN coalesce(referral_earnings, 0) + p_amount
+        ELSE referral_earnings
+      END
+  WHERE id = p_user_id
+  RETURNING balance INTO v_balance;
+
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO transactions (user_id, type, amount, description, reference_id)
+  VALUES (p_user_id, p_type, p_amount, p_description, p_reference_id);
+
+  RETURN QUERY SELECT v_balance::numeric;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION apply_balance_delta(bigint, numeric, text, text, text) TO service_role;
+
+CREATE OR REPLACE FUNCTION compact_balance_ledger(p_settle interval DEFAULT interval '1 minute')
+RETURNS TABLE (compacted_users int)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_horizon int;
+  v_count int;
+BEGIN
+  IF NOT ledger_mode() OR NOT pg_try_advisory_xact_lock(hashtext('compact_balance_ledger')) THEN
+    RETURN QUERY SELECT 0;
+    RETURN;
+  END IF;
+
+  SELECT coalesce(max(id), 0) INTO v_horizon
+  FROM transactions
+  WHERE created_at <= now() - p_settle;
+
+  WITH deltas AS (
+    SELECT
+      t.user_id,
+      sum(t.amount) AS amount,
+      coalesce(sum(t.amount) FILTER (WHERE t.type = 'referral'), 0) AS referral,
+      max(t.id) AS last_tx_id
+    FROM transactions t
+    LEFT JOIN balance_snapshots s ON s.user_id = t.user_id
+    WHERE t.user_id IS NOT NULL
+      AND t.id > coalesce(s.last_tx_id, 0)
+      AND t.id <= v_horizon
+    GROUP BY t.user_id
+  ),
+  rolled AS (
+    INSERT INTO balance_snapshots AS s (user_id, balance, referral_earnings, last_tx_id, updated_at)
+    SELECT d.user_id, d.amount, d.referral, d.last_tx_id, now()
+    FROM deltas d
+    ON CONFLICT (user_id) DO UPDATE
+    SET balance = s.balance + EXCLUDED.balance,
+        referral_earnings = s.referral_earnings + EXCLUDED.referral_earnings,
+        last_tx_id = EXCLUDED.last_tx_id,
+        updated_at = now()
+    RETURNING s.user_id, s.balance, s.referral_earnings
+  )
+  UPDATE users u
+  SET balance = r.balance,
+      referral_earnings = r.referral_earnings
+  FROM rolled r
+  WHERE u.id = r.user_id;
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN QUERY SELECT v_count;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION compact_balance_ledger(interval) TO service_role;
+
+CREATE OR REPLACE FUNCTION enable_balance_ledger()
+RETURNS void
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+  IF ledger_mode() THEN
+    RETURN;
+  END IF;
+
+  LOCK TABLE users, transactions IN SHARE ROW EXCLUSIVE MODE;
+
+  INSERT INTO balance_snapshots (user_id, balance, referral_earnings, last_tx_id, updated_at)
+  SELECT
+    u.id,
+    coalesce(u.balance, 0),
+    coalesce(u.referral_earnings, 0),
+    (SELECT coalesce(max(id), 0) FROM transactions),
+    now()
+  FROM users u
+  ON CONFLICT (user_id) DO UPDATE
+  SET balance = EXCLUDED.balance,
+      referral_earnings = EXCLUDED.referral_earnings,
+      last_tx_id = EXCLUDED.last_tx_id,
+      updated_at = now();
+
+  INSERT INTO settings (key, value, updated_at)
+  VALUES ('balance_mode', 'ledger', now())
+  ON CONFLICT (key) DO UPDATE SET value = 'ledger', updated_at = now();
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION disable_balance_ledger()
+RETURNS void
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+  IF NOT ledger_mode() THEN
+    RETURN;
+  END IF;
+
+  LOCK TABLE users, transactions IN SHARE ROW EXCLUSIVE MODE;
+  PERFORM compact_balance_ledger(interval '0');
+
+  UPDATE settings SET value = 'column', updated_at = now() WHERE key = 'balance_mode';
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION checkout_cart(
+  p_user_id bigint,
+  p_payment_method text DEFAULT 'balance',
+  p_coupon_code text DEFAULT NULL,
+  p_referral_commission numeric DEFAULT 10,
+  p_tier_thresholds jsonb DEFAULT '{"bronze": 0, "silver": 50, "gold": 200, "platinum": 500}'
+)
+RETURNS TABLE (
+  order_id int,
+  total numeric,
+  discount numeric,
+  balance numeric,
+  product_id int,
+  product_name text,
+  product_type text,
+  stock_id int,
+  data text
+)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_user users%ROWTYPE;
+  v_coupon coupons%ROWTYPE;
+  v_item record;
+  v_stock record;
+  v_subtotal numeric(10,2) := 0;
+  v_discount numeric(10,2) := 0;
+  v_total numeric(10,2);
+  v_balance numeric(10,2);
+  v_commission numeric(10,2);
+  v_order_id int;
+  v_claimed int;
+  v_tier text;
+  v_items jsonb := '[]'::jsonb;
+BEGIN
+  SELECT * INTO v_user FROM users WHERE id = p_user_id FOR NO KEY UPDATE;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'User not found';
+  END IF;
+
+  SELECT coalesce(sum(p.price * c.quantity), 0) INTO v_subtotal
+  FROM cart c
+  JOIN products p ON p.id = c.product_id
+  WHERE c.user_id = p_user_id;
+
+  IF NOT EXISTS (
+    SELECT 1 FROM cart c JOIN products p ON p.id = c.product_id WHERE c.user_id = p_user_id
+  ) THEN
+    RAISE EXCEPTION 'Cart expired';
+  END IF;
+
+  IF p_coupon_code IS NOT NULL THEN
+    SELECT * INTO v_coupon
+    FROM coupons
+    WHERE code = upper(p_coupon_code) AND is_active = true
+    FOR UPDATE;
+
+    IF FOUND
+      AND (coalesce(v_coupon.max_uses, 0) = 0 OR v_coupon.used_count < v_coupon.max_uses)
+      AND (v_coupon.expires_at IS NULL OR v_coupon.expires_at > now())
+      AND (v_coupon.min_purchase IS NULL OR v_subtotal >= v_coupon.min_purchase)
+    THEN
+      IF coalesce(v_coupon.discount_percent, 0) > 0 THEN
+        v_discount := v_subtotal * v_coupon.discount_percent / 100;
+      ELSIF coalesce(v_coupon.discount_amount, 0) > 0 THEN
+        v_discount := least(v_coupon.discount_amount, v_subtotal);
+      END IF;
+    ELSE
+      v_coupon := NULL;
+    END IF;
+  END IF;
+
+  v_total := v_subtotal - v_discount;
+
+  IF p_payment_method = 'balance' AND coalesce(live_balance(v_user), 0) < v_total THEN
+    RAISE EXCEPTION 'Insufficient balance!';
+  END IF;
+
+  INSERT INTO orders (user_id, total, discount_applied, coupon_code, status, payment_method)
+  VALUES (p_user_id, v_total, v_discount, v_coupon.code, 'completed', p_payment_method)
+  RETURNING id INTO v_order_id;
+
+  FOR v_item IN
+    SELECT c.product_id, c.quantity, p.name, p.price, p.product_type
+    FROM cart c
+    JOIN products p ON p.id = c.product_id
+    WHERE c.user_id = p_user_id
+    ORDER BY c.id
+  LOOP
+    v_claimed := 0;
+
+    FOR v_stock IN
+      SELECT s.id, s.data FROM claim_stock(v_item.product_id, v_item.quantity, p_user_id) AS s
+    LOOP
+      INSERT INTO order_items (order_id, product_id, stock_id, price, quantity)
+      VALUES (v_order_id, v_item.product_id, v_stock.id, v_item.price, 1);
+
+      v_items := v_items || jsonb_build_object(
+        'product_id', v_item.product_id,
+        'product_name', v_item.name,
+        'product_type', coalesce(v_item.product_type, 'key'),
+        'stock_id', v_stock.id,
+        'data', v_stock.data
+      );
+      v_claimed := v_claimed + 1;
+    END LOOP;
+
+    IF v_claimed < v_item.quantity THEN
+      RAISE EXCEPTION 'Insufficient stock for %!', v_item.name;
+    END IF;
+  END LOOP;
+
+  IF p_payment_method = 'balance' THEN
+    PERFORM apply_balance_delta(p_user_id, -v_total, 'purchase', 'Purchase - Order #' || v_order_id, v_order_id::text);
+  END IF;
+
+  SELECT t.key INTO v_tier
+  FROM jsonb_each_text(p_tier_thresholds) AS t
+  WHERE t.value::numeric <= coalesce(v_user.total_spent, 0) + v_total
+  ORDER BY t.value::numeric DESC
+  LIMIT 1;
+
+  UPDATE users
+  SET total_spent = coalesce(total_spent, 0) + v_total,
+      tier = coalesce(v_tier, tier)
+  WHERE id = p_user_id;
+
+  v_balance := current_balance(p_user_id);
+
+  IF v_user.referred_by IS NOT NULL AND v_user.referred_by <> p_user_id THEN
+    v_commission := v_total * p_referral_commission / 100;
+
+    PERFORM apply_balance_delta(v_user.referred_by, v_commission, 'referral', 'Commission from referral purchase', v_order_id::text);
+  END IF;
+
+  IF v_coupon.id IS NOT NULL THEN
+    UPDATE coupons SET used_count = coalesce(used_count, 0) + 1 WHERE id = v_coupon.id;
+  END IF;
+
+  DELETE FROM cart WHERE user_id = p_user_id;
+
+  RETURN QUERY
+  SELECT
+    v_order_id,
+    v_total::numeric,
+    v_discount::numeric,
+    v_balance::numeric,
+    (i->>'product_id')::int,
+    i->>'product_name',
+    i->>'product_type',
+    (i->>'stock_id')::int,
+    i->>'data'
+  FROM jsonb_array_elements(v_items) AS i;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION checkout_cart(bigint, text, text, numeric, jsonb) TO service_role;
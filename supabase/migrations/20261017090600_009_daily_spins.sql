@@ -0,0 +1,45 @@
+/*
+  # Daily Spin Log
+
+  1. New Tables
+    - `daily_spins` - one row per user per day
+      - `user_id` (bigint, references users)
+      - `spin_date` (date) - defaults to the database's current date
+      - `reward` (decimal) - credits won, 0 for a losing spin
+      - `created_at` (timestamptz)
+      - Primary key (`user_id`, `spin_date`)
+
+  2. Purpose
+    - Claiming today's spin is a single insert that is ignored on
+      conflict, so the "already spun" check is one indexed write instead
+      of scanning recent `transactions`
+    - Losing spins no longer need a zero-amount `transactions` row
+
+  3. Backfill
+    - Existing `spin` transactions are copied in so users who already
+      spun today can't spin again after the migration
+*/
+
+CREATE TABLE IF NOT EXISTS daily_spins (
+  user_id bigint NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  spin_date date NOT NULL DEFAULT current_date,
+  reward decimal(10,2) NOT NULL DEFAULT 0.00,
+  created_at timestamptz DEFAULT now(),
+  PRIMARY KEY (user_id, spin_date)
+);
+
+ALTER TABLE daily_spins ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access to daily_spins"
+  ON daily_spins
+  FOR ALL
+  TO service_role
+  USING (true)
+  WITH CHECK (true);
+
+INSERT INTO daily_spins (user_id, spin_date, reward, created_at)
+SELECT user_id, created_at::date, sum(amount), min(created_at)
+FROM transactions
+WHERE type = 'spin' AND user_id IS NOT NULL
+GROUP BY user_id, created_at::date
+ON CONFLICT (user_id, spin_date) DO NOTHING;
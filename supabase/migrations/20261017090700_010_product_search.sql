@@ -0,0 +1,53 @@
+/*
+  # Ranked Product Search
+
+  1. Extensions
+    - `pg_trgm` (in the `extensions` schema)
+
+  2. Indexes
+    - Trigram GIN indexes on `products.name` and `products.description`,
+      so substring and fuzzy matches no longer scan the whole table
+
+  3. New Functions
+    - `search_products(p_query, p_limit)` - active products whose name or
+      description contains the query, or whose name is a close fuzzy
+      match (typos), ranked best first and capped at `p_limit`
+*/
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm
+  ON products USING gin (name extensions.gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_products_description_trgm
+  ON products USING gin (description extensions.gin_trgm_ops);
+
+CREATE OR REPLACE FUNCTION search_products(p_query text, p_limit int DEFAULT 10)
+RETURNS SETOF products
+LANGUAGE sql
+STABLE
+SET search_path = public, extensions
+SET pg_trgm.word_similarity_threshold = 0.4
+AS $$
+  WITH q AS (
+    SELECT
+      lower(trim(p_query)) AS term,
+      '%' || replace(replace(replace(lower(trim(p_query)), '\', '\\'), '%', '\%'), '_', '\_') || '%' AS pattern
+  )
+  SELECT p.*
+  FROM products p, q
+  WHERE p.is_active = true
+    AND (
+      p.name ILIKE q.pattern
+      OR p.description ILIKE q.pattern
+      OR p.name %> q.term
+    )
+  ORDER BY
+    (p.name ILIKE q.pattern) DESC,
+    word_similarity(q.term, p.name) DESC,
+    similarity(p.name, q.term) DESC,
+    p.id
+  LIMIT greatest(p_limit, 1);
+$$;
+
+GRANT EXECUTE ON FUNCTION search_products(text, int) TO service_role;
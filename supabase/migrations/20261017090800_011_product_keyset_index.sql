@@ -0,0 +1,12 @@
+/*
+  # Keyset Pagination Index for Products
+
+  1. Indexes
+    - `idx_products_active_category_id` on `products(category_id, id)`
+      for active products, so a catalog page (`category_id = ? AND
+      id > ? ORDER BY id LIMIT n`) is a bounded index range scan
+*/
+
+CREATE INDEX IF NOT EXISTS idx_products_active_category_id
+  ON products(category_id, id)
+  WHERE is_active = true;
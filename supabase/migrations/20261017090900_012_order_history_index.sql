@@ -0,0 +1,11 @@
+/*
+  # Keyset Pagination Index for Order History
+
+  1. Indexes
+    - `idx_orders_user_id` on `orders(user_id, id)`, so a history page
+      (`user_id = ? AND id < ? ORDER BY id DESC LIMIT n`) and the
+      per-user order count are index-only range scans
+    - Transactions are already covered by `idx_transactions_user_ledger`
+*/
+
+CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders(user_id, id);
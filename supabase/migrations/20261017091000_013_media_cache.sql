@@ -0,0 +1,29 @@
+/*
+  # Telegram Media Cache
+
+  1. New Tables
+    - `media_cache` - Telegram `file_id` for each image source already
+      uploaded through the bot
+      - `source` (text, primary key) - image URL (or other source key)
+      - `file_id` (text) - `file_id` returned by the first send
+      - `updated_at` (timestamptz)
+
+  2. Purpose
+    - Later sends reuse the `file_id`, so Telegram doesn't download and
+      re-process the remote image on every product view
+*/
+
+CREATE TABLE IF NOT EXISTS media_cache (
+  source text PRIMARY KEY,
+  file_id text NOT NULL,
+  updated_at timestamptz DEFAULT now()
+);
+
+ALTER TABLE media_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access to media_cache"
+  ON media_cache
+  FOR ALL
+  TO service_role
+  USING (true)
+  WITH CHECK (true);
@@ -0,0 +1,78 @@
+/*
+  # Fix Shop Stats Slot Selection and Add Reconciliation
+
+  1. Changes
+    - `bump_shop_stats` picks its slot once per call. The previous
+      `WHERE slot = floor(random() * 16)::int` evaluated the volatile
+      `random()` per row, so a bump could update zero, one or several
+      slots and the counters drifted
+
+  2. New Functions
+    - `reconcile_shop_stats()` - recomputes every counter from the base
+      tables into slot 0 and zeroes the other slots, then returns the
+      totals like `get_shop_stats()`
+      - Takes an EXCLUSIVE lock on `shop_stats`, so concurrent bumps wait
+        for the recount instead of being lost
+
+  3. Data
+    - Runs `reconcile_shop_stats()` once to repair counters that already
+      drifted
+*/
+
+CREATE OR REPLACE FUNCTION bump_shop_stats(
+  d_users bigint,
+  d_orders bigint,
+  d_revenue numeric,
+  d_products bigint,
+  d_stock bigint
+)
+RETURNS void
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_slot int := floor(random() * 16)::int;
+BEGIN
+  UPDATE shop_stats
+  SET user_count = user_count + d_users,
+      order_count = order_count + d_orders,
+      revenue = revenue + d_revenue,
+      product_count = product_count + d_products,
+      stock_count = stock_count + d_stock
+  WHERE slot = v_slot;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION reconcile_shop_stats()
+RETURNS TABLE (
+  total_users bigint,
+  total_orders bigint,
+  total_revenue numeric,
+  total_products bigint,
+  total_stock bigint
+)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+  LOCK TABLE shop_stats IN EXCLUSIVE MODE;
+
+  UPDATE shop_stats SET
+    user_count = (SELECT count(*) FROM users),
+    order_count = (SELECT count(*) FROM orders WHERE status = 'completed'),
+    revenue = (SELECT coalesce(sum(o.total), 0) FROM orders o WHERE o.status = 'completed'),
+    product_count = (SELECT count(*) FROM products WHERE is_active = true),
+    stock_count = (SELECT count(*) FROM stock WHERE is_sold = false)
+  WHERE slot = 0;
+
+  UPDATE shop_stats SET
+    user_count = 0, order_count = 0, revenue = 0, product_count = 0, stock_count = 0
+  WHERE slot <> 0;
+
+  RETURN QUERY SELECT * FROM get_shop_stats();
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION reconcile_shop_stats() TO service_role;
+
+SELECT reconcile_shop_stats();
@@ -0,0 +1,45 @@
+/*
+  # Atomic Daily Spin Claim
+
+  1. New Functions
+    - `claim_daily_spin(p_user_id, p_reward)`
+      - Inserts today's `daily_spins` row and, for a winning spin,
+        credits the reward through `apply_balance_delta` in the same
+        transaction
+      - Returns `claimed = false` (and no credit) when the user already
+        spun today
+      - Returns the user's balance after the claim
+
+  2. Purpose
+    - The spin used to be recorded first and the reward credited in a
+      separate call afterwards, so a failure between the two used up
+      the day's spin without paying the reward
+*/
+
+CREATE OR REPLACE FUNCTION claim_daily_spin(p_user_id bigint, p_reward numeric)
+RETURNS TABLE (claimed boolean, new_balance numeric)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO daily_spins (user_id, reward)
+  VALUES (p_user_id, p_reward)
+  ON CONFLICT (user_id, spin_date) DO NOTHING;
+
+  IF NOT FOUND THEN
+    RETURN QUERY SELECT false, current_balance(p_user_id);
+    RETURN;
+  END IF;
+
+  IF p_reward > 0 THEN
+    RETURN QUERY
+    SELECT true, d.new_balance
+    FROM apply_balance_delta(p_user_id, p_reward, 'spin', 'Daily spin reward') AS d;
+    RETURN;
+  END IF;
+
+  RETURN QUERY SELECT true, current_balance(p_user_id);
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION claim_daily_spin(bigint, numeric) TO service_role;
@@ -0,0 +1,74 @@
+import time
+
+from src.database.cache import TTLCache
+
+
+def test_get_returns_value_until_ttl_expires():
+    cache = TTLCache(ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert "a" in cache
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_get_returns_default_for_missing_key():
+    cache = TTLCache(ttl=10)
+    assert cache.get("missing", "fallback") == "fallback"
+
+
+def test_falsy_values_are_cached():
+    cache = TTLCache(ttl=10)
+    cache.set("empty", [])
+    assert cache.get("empty", "default") == []
+
+
+def test_maxsize_evicts_least_recently_used():
+    cache = TTLCache(ttl=10, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_invalidate_and_clear():
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    cache.invalidate("never-set")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_invalidate_prefix_only_drops_matching_tuple_keys():
+    cache = TTLCache(ttl=10)
+    cache.set(("products_page", 1, None, None, 10), "p1")
+    cache.set(("products_page", 1, 5, None, 10), "p1b")
+    cache.set(("products_page", 2, None, None, 10), "p2")
+    cache.set(("products", 1), "list")
+    cache.set("plain", "value")
+
+    assert cache.invalidate_prefix(("products_page", 1)) == 2
+    assert cache.get(("products_page", 2, None, None, 10)) == "p2"
+    assert cache.get(("products", 1)) == "list"
+    assert cache.get("plain") == "value"
+
+
+def test_get_stale_keeps_expired_values_until_invalidated():
+    cache = TTLCache(ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get_stale("a") == 1
+    cache.invalidate("a")
+    assert cache.get_stale("a", "gone") == "gone"
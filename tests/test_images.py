@@ -0,0 +1,40 @@
+import io
+
+from PIL import Image
+
+from src.bot.images import optimize_image
+
+
+def encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_large_image_is_downscaled_to_jpeg():
+    data = encode(Image.new("RGB", (2000, 1000), (200, 10, 10)), "PNG")
+    output = optimize_image(data, max_size=500, quality=80)
+
+    with Image.open(io.BytesIO(output)) as result:
+        assert result.format == "JPEG"
+        assert result.size == (500, 250)
+
+
+def test_small_image_is_not_upscaled():
+    data = encode(Image.new("RGB", (100, 50)), "PNG")
+    with Image.open(io.BytesIO(optimize_image(data, max_size=500, quality=80))) as result:
+        assert result.size == (100, 50)
+
+
+def test_transparency_is_flattened_onto_white():
+    data = encode(Image.new("RGBA", (10, 10), (0, 0, 0, 0)), "PNG")
+    with Image.open(io.BytesIO(optimize_image(data, max_size=100, quality=90))) as result:
+        assert result.mode == "RGB"
+        r, g, b = result.getpixel((5, 5))
+        assert min(r, g, b) > 240
+
+
+def test_palette_and_grayscale_inputs_become_rgb():
+    for image in (Image.new("P", (20, 20)), Image.new("L", (20, 20), 128)):
+        with Image.open(io.BytesIO(optimize_image(encode(image, "PNG"), max_size=100, quality=90))) as result:
+            assert result.mode == "RGB"
@@ -0,0 +1,42 @@
+import asyncio
+
+from src.database.ledger import LedgerCompactor
+
+
+class FakeDatabase:
+    def __init__(self, results):
+        self.results = list(results)
+
+    async def compact_balance_ledger(self):
+        return self.results.pop(0)
+
+
+def test_compact_counts_runs_and_compacted_users():
+    compactor = LedgerCompactor(FakeDatabase([3, 0]), interval=60)
+
+    assert asyncio.run(compactor.compact()) == 3
+    assert asyncio.run(compactor.compact()) == 0
+    assert compactor.stats() == {"runs": 2, "compacted": 3}
+
+
+def test_background_task_survives_errors_and_stops():
+    class FlakyDatabase:
+        calls = 0
+
+        async def compact_balance_ledger(self):
+            self.calls += 1
+            if self.calls == 1:
+                raise RuntimeError("boom")
+            return 1
+
+    async def scenario():
+        database = FlakyDatabase()
+        compactor = LedgerCompactor(database, interval=0.01)
+        compactor.start()
+        await asyncio.sleep(0.1)
+        await compactor.stop()
+        return database.calls, compactor.stats()
+
+    calls, stats = asyncio.run(scenario())
+    assert calls >= 2
+    assert stats["compacted"] == calls - 1
@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.bot.middlewares.ordering import OrderedUpdatesMiddleware
+
+
+def event(n):
+    return SimpleNamespace(n=n, inline_query=None)
+
+
+def test_updates_from_one_user_run_in_order_and_lanes_are_released():
+    async def scenario():
+        middleware = OrderedUpdatesMiddleware(max_active=2)
+        seen = []
+
+        async def handler(update, data):
+            await asyncio.sleep(0.001 * (5 - update.n % 5))
+            seen.append((data["event_from_user"].id, update.n))
+
+        tasks = [
+            asyncio.ensure_future(middleware(handler, event(n), {"event_from_user": SimpleNamespace(id=n % 3)}))
+            for n in range(15)
+        ]
+        await asyncio.sleep(0)
+        assert middleware.stats()["lanes"] == 3
+        assert middleware.stats()["running"] <= 2
+
+        await asyncio.gather(*tasks)
+        for user_id in range(3):
+            ns = [n for uid, n in seen if uid == user_id]
+            assert ns == sorted(ns)
+        stats = middleware.stats()
+        assert stats["lanes"] == 0
+        assert stats["released"] == 3
+        assert stats["peak_running"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_updates_without_user_bypass_lanes():
+    async def scenario():
+        middleware = OrderedUpdatesMiddleware(max_active=1)
+
+        async def handler(update, data):
+            return "handled"
+
+        assert await middleware(handler, event(1), {}) == "handled"
+        assert middleware.stats()["lanes"] == 0
+
+    asyncio.run(scenario())
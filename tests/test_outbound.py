@@ -0,0 +1,123 @@
+import asyncio
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, GetMe, SendMessage
+
+from src.bot.outbound import OutboundMiddleware, OutboundScheduler
+
+
+def make_scheduler(**overrides):
+    options = dict(global_rate=100, chat_rate=100, chat_burst=5, group_rate=100, max_retries=2, drain_timeout=2)
+    options.update(overrides)
+    return OutboundScheduler(**options)
+
+
+def test_passes_through_while_stopped():
+    async def scenario():
+        scheduler = make_scheduler()
+        calls = []
+
+        async def make_request(bot, method):
+            calls.append(method)
+            return "ok"
+
+        assert await OutboundMiddleware(scheduler)(make_request, None, SendMessage(chat_id=1, text="hi")) == "ok"
+        assert scheduler.stats()["submitted"] == 0
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_answers_go_before_messages_and_plain_calls_bypass_the_queue():
+    async def scenario():
+        scheduler = make_scheduler()
+        middleware = OutboundMiddleware(scheduler)
+        order = []
+
+        async def make_request(bot, method):
+            order.append(type(method).__name__)
+            return True
+
+        scheduler.start()
+        sends = [middleware(make_request, None, SendMessage(chat_id=i, text="m")) for i in range(3)]
+        answer = middleware(make_request, None, AnswerCallbackQuery(callback_query_id="q"))
+        await asyncio.gather(*sends, answer, middleware(make_request, None, GetMe()))
+        await scheduler.stop()
+
+        assert order[0] == "GetMe"
+        assert order.index("AnswerCallbackQuery") < order.index("SendMessage")
+        assert scheduler.stats()["submitted"] == 4
+
+    asyncio.run(scenario())
+
+
+def test_flood_wait_on_chatless_job_does_not_block_chat_sends():
+    async def scenario():
+        scheduler = make_scheduler()
+        middleware = OutboundMiddleware(scheduler)
+        sent = []
+        flood = {"left": 1}
+
+        async def make_request(bot, method):
+            if isinstance(method, AnswerCallbackQuery) and flood["left"]:
+                flood["left"] -= 1
+                raise TelegramRetryAfter(method=method, message="flood", retry_after=1)
+            sent.append(type(method).__name__)
+            return True
+
+        scheduler.start()
+        answer = asyncio.ensure_future(middleware(make_request, None, AnswerCallbackQuery(callback_query_id="q")))
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(middleware(make_request, None, SendMessage(chat_id=1, text="m")), timeout=0.5)
+        assert not answer.done()
+        assert await answer is True
+        await scheduler.stop()
+
+        assert sent == ["SendMessage", "AnswerCallbackQuery"]
+        assert scheduler.stats()["retried"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_gives_up_after_max_retries():
+    async def scenario():
+        scheduler = make_scheduler(max_retries=1)
+
+        async def make_request(bot, method):
+            raise TelegramRetryAfter(method=method, message="flood", retry_after=0)
+
+        scheduler.start()
+        try:
+            await OutboundMiddleware(scheduler)(make_request, None, SendMessage(chat_id=1, text="m"))
+        except TelegramRetryAfter:
+            pass
+        else:
+            raise AssertionError("expected TelegramRetryAfter")
+        await scheduler.stop()
+        assert scheduler.stats()["failed"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_stop_drains_queue_under_per_chat_limits():
+    async def scenario():
+        scheduler = make_scheduler(chat_rate=20, chat_burst=1)
+        middleware = OutboundMiddleware(scheduler)
+        loop = asyncio.get_running_loop()
+        times = []
+
+        async def make_request(bot, method):
+            times.append(loop.time())
+            return True
+
+        scheduler.start()
+        pending = [asyncio.ensure_future(middleware(make_request, None, SendMessage(chat_id=1, text="m"))) for _ in range(4)]
+        await asyncio.sleep(0)
+        await scheduler.stop()
+
+        assert all(task.done() for task in pending)
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        assert len(times) == 4
+        assert min(gaps) >= 0.04
+
+    asyncio.run(scenario())
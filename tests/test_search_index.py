@@ -0,0 +1,100 @@
+from src.database.search_index import CatalogSearchIndex, text_trigrams, tokenize
+
+CATEGORIES = [
+    {"id": 1, "name": "Games"},
+    {"id": 2, "name": "Music"},
+]
+
+PRODUCTS = [
+    {"id": 1, "name": "Steam Gift Card", "category_id": 1, "description": "Wallet code for PC", "price": 10.0, "available_stock": 7},
+    {"id": 2, "name": "Spotify Premium", "category_id": 2, "description": "One month"},
+    {"id": 3, "name": "Stream Deck Profile", "category_id": 1, "description": None},
+    {"id": 4, "name": "Hidden Product", "category_id": 1, "is_active": False},
+]
+
+
+def build(threshold=0.4):
+    index = CatalogSearchIndex(threshold=threshold)
+    index.build(CATEGORIES, PRODUCTS)
+    return index
+
+
+def test_tokenize_and_trigrams():
+    assert tokenize("Steam-Gift card") == ["steam", "gift", "card"]
+    assert tokenize(None) == []
+    assert "  s" in text_trigrams("steam")
+    assert "am " in text_trigrams("steam")
+
+
+def test_build_skips_inactive_products():
+    index = build()
+    assert index.ready
+    assert len(index) == 3
+    assert 4 not in index.search("hidden")
+
+
+def test_search_returns_ids_with_name_matches_first():
+    index = build()
+    results = index.search("steam")
+    assert results[0] == 1
+    assert 2 not in results
+
+
+def test_search_tolerates_typos():
+    assert build().search("spotfy") == [2]
+
+
+def test_search_matches_category_names():
+    assert set(build().search("games")) == {1, 3}
+
+
+def test_search_respects_limit_and_empty_queries():
+    index = build(threshold=0.0)
+    assert len(index.search("s", limit=1)) <= 1
+    assert index.search("   ") == []
+
+
+def test_upsert_and_remove_product():
+    index = build()
+    index.upsert_product({"id": 2, "name": "Apple Music", "category_id": 2})
+    assert index.search("spotify") == []
+    assert index.search("apple") == [2]
+
+    index.remove_product(2)
+    assert index.search("apple") == []
+    assert len(index) == 2
+
+
+def test_upsert_product_with_inactive_flag_removes_it():
+    index = build()
+    index.upsert_product({"id": 1, "name": "Steam Gift Card", "category_id": 1, "is_active": False})
+    assert 1 not in index.search("steam")
+
+
+def test_category_rename_reindexes_its_products():
+    index = build()
+    index.upsert_category({"id": 2, "name": "Audio"})
+    assert index.search("audio") == [2]
+    assert index.search("music") == []
+
+    index.remove_category(1)
+    assert index.search("games") == []
+    assert 1 in index.search("steam")
+
+
+def test_get_returns_display_fields_without_stock():
+    index = build()
+    product = index.get(1)
+    assert product["name"] == "Steam Gift Card"
+    assert product["price"] == 10.0
+    assert "available_stock" not in product
+
+    product["name"] = "changed"
+    assert index.get(1)["name"] == "Steam Gift Card"
+    assert index.get(4) is None
+
+
+def test_category_rename_keeps_display_fields():
+    index = build()
+    index.upsert_category({"id": 1, "name": "PC Games"})
+    assert index.get(1)["price"] == 10.0
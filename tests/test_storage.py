@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+
+from src.bot.storage import SQLiteStorage, storage_key_id
+
+
+class Form(StatesGroup):
+    name = State()
+
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=3)
+
+
+def test_storage_key_id():
+    assert storage_key_id(KEY) == "1:2:3:default"
+    assert storage_key_id(StorageKey(bot_id=1, chat_id=2, user_id=3, thread_id=4)) == "1:2:3:4:default"
+
+
+def test_state_and_data_round_trip(tmp_path):
+    async def scenario():
+        storage = SQLiteStorage(str(tmp_path / "fsm.sqlite3"))
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+
+        await storage.set_state(KEY, Form.name)
+        await storage.set_data(KEY, {"price": 9.5})
+        assert await storage.get_state(KEY) == Form.name.state
+        assert await storage.get_data(KEY) == {"price": 9.5}
+
+        await storage.set_state(KEY, None)
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {"price": 9.5}
+
+        await storage.set_data(KEY, {})
+        assert await storage.get_data(KEY) == {}
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_values_survive_reopen(tmp_path):
+    path = str(tmp_path / "fsm.sqlite3")
+
+    async def write():
+        storage = SQLiteStorage(path)
+        await storage.set_state(KEY, "Form:name")
+        await storage.close()
+
+    async def read():
+        storage = SQLiteStorage(path)
+        state = await storage.get_state(KEY)
+        await storage.close()
+        return state
+
+    asyncio.run(write())
+    assert asyncio.run(read()) == "Form:name"
+
+
+def test_expired_rows_are_ignored_and_not_resurrected(tmp_path):
+    async def scenario():
+        storage = SQLiteStorage(str(tmp_path / "fsm.sqlite3"), ttl=0.05)
+        await storage.set_state(KEY, "Form:name")
+        await storage.set_data(KEY, {"step": 1})
+        time.sleep(0.06)
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+
+        await storage.set_state(KEY, "Form:price")
+        assert await storage.get_state(KEY) == "Form:price"
+        assert await storage.get_data(KEY) == {}
+        await storage.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,24 @@
+from src.bot.supervisor import update_routing_key
+
+
+def test_routes_messages_by_sender():
+    raw = {"update_id": 1, "message": {"message_id": 5, "from": {"id": 42}, "chat": {"id": -100}}}
+    assert update_routing_key(raw) == 42
+
+
+def test_routes_callbacks_and_inline_queries_by_sender():
+    assert update_routing_key({"update_id": 2, "callback_query": {"id": "x", "from": {"id": 7}}}) == 7
+    assert update_routing_key({"update_id": 3, "inline_query": {"id": "q", "from": {"id": 8}}}) == 8
+
+
+def test_routes_poll_answers_by_user():
+    assert update_routing_key({"update_id": 4, "poll_answer": {"poll_id": "p", "user": {"id": 9}}}) == 9
+
+
+def test_falls_back_to_chat_id():
+    assert update_routing_key({"update_id": 5, "channel_post": {"message_id": 1, "chat": {"id": -55}}}) == -55
+
+
+def test_unknown_updates_route_to_zero():
+    assert update_routing_key({"update_id": 6}) == 0
+    assert update_routing_key({"update_id": 7, "poll": {"id": "p"}}) == 0
@@ -0,0 +1,47 @@
+from src.bot.middlewares.throttling import TokenBucket, parse_rate_rules
+
+
+def test_parse_rate_rules():
+    rules = parse_rate_rules("cart_inc_:2/4, pay_:0.5, broken, bad:x/1, spin_now:0.5/1")
+    assert rules == {
+        "cart_inc_": (2.0, 4.0),
+        "pay_": (0.5, 0.5),
+        "spin_now": (0.5, 1.0),
+    }
+
+
+def test_parse_rate_rules_empty():
+    assert parse_rate_rules("") == {}
+
+
+def test_bucket_allows_burst_then_refuses():
+    bucket = TokenBucket(rate=1, capacity=3)
+    now = bucket.updated_at
+    assert [bucket.consume(now) for _ in range(4)] == [True, True, True, False]
+
+
+def test_bucket_refills_over_time_up_to_capacity():
+    bucket = TokenBucket(rate=2, capacity=2)
+    now = bucket.updated_at
+    bucket.consume(now)
+    bucket.consume(now)
+    assert not bucket.consume(now)
+    assert bucket.consume(now + 0.5)
+    bucket.refill(now + 100)
+    assert bucket.tokens == 2
+
+
+def test_bucket_delay():
+    bucket = TokenBucket(rate=4, capacity=1)
+    now = bucket.updated_at
+    assert bucket.delay(now) == 0.0
+    bucket.consume(now)
+    assert abs(bucket.delay(now) - 0.25) < 1e-9
+    assert bucket.delay(now + 0.25) == 0.0
+
+
+def test_bucket_delay_with_zero_rate_is_infinite():
+    bucket = TokenBucket(rate=0, capacity=1)
+    now = bucket.updated_at
+    bucket.consume(now)
+    assert bucket.delay(now + 10) == float("inf")